@@ -0,0 +1,163 @@
+"""
+Lean command-line entry point: runs one Brewin program with interpreterv1.
+Only the interpreter is imported (no harness, asyncio or argparse), so short
+programs don't pay for modules a plain run never uses. With --snapshot, the
+parsed program is saved as marshal data in __pycache__ next to the source and
+reused while the source is unchanged, so repeat runs skip parsing.
+
+usage: python3 brewin.py [--snapshot] PROGRAM [INPUT]
+       python3 brewin.py --startup-benchmark
+"""
+
+import marshal
+import sys
+from os import makedirs, stat
+from os.path import abspath, basename, dirname, join
+
+from bparser import BParser, StringWithLineNumber
+from intbase import ErrorType
+from interpreterv1 import Interpreter
+
+USAGE = "usage: brewin.py [--snapshot] PROGRAM [INPUT] | --startup-benchmark"
+BENCHMARK_PROGRAM = '(class main (method main () (print "hello world")))\n'
+
+
+def main(argv):
+    """Run the program named in argv; returns the process exit code."""
+    flags = {arg for arg in argv if arg.startswith("--")}
+    paths = [arg for arg in argv if not arg.startswith("--")]
+    if flags == {"--startup-benchmark"} and not paths:
+        return startup_benchmark()
+    if flags - {"--snapshot"} or not 1 <= len(paths) <= 2:
+        print(USAGE, file=sys.stderr)
+        return 2
+    with open(paths[0], encoding="utf-8") as handle:
+        program = handle.readlines()
+    inp = None
+    if len(paths) == 2:
+        with open(paths[1], encoding="utf-8") as handle:
+            inp = handle.read().splitlines()
+
+    interpreter = Interpreter(console_output=True, inp=inp)
+    try:
+        if "--snapshot" in flags:
+            parsed_program = load_snapshot(paths[0], program)
+            if parsed_program is None:
+                interpreter.error(ErrorType.SYNTAX_ERROR)
+            interpreter.run_parsed(parsed_program)
+        elif interpreter.run(program) is SyntaxError:
+            interpreter.error(ErrorType.SYNTAX_ERROR)
+    except RuntimeError as exception:
+        print(exception, file=sys.stderr)
+        return 1
+    return 0
+
+
+def load_snapshot(path, program):
+    """
+    Parsed program for the source at path (whose lines are program), from its
+    snapshot if that is current; otherwise parse it and write a new snapshot.
+    Returns None if the program has a syntax error.
+    """
+    snapshot_path = join(
+        dirname(abspath(path)), "__pycache__", f"{basename(path)}.snapshot"
+    )
+    source = stat(path)
+    key = [source.st_mtime_ns, source.st_size]
+    try:
+        with open(snapshot_path, "rb") as handle:
+            saved_key, frozen = marshal.load(handle)
+        if saved_key == key:
+            return _thaw(frozen)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    status, parsed_program = BParser.parse(program)
+    if not status:
+        return None
+    try:
+        makedirs(dirname(snapshot_path), exist_ok=True)
+        with open(snapshot_path, "wb") as handle:
+            marshal.dump([key, _freeze(parsed_program)], handle)
+    except OSError:
+        pass  # read-only location; just run without a snapshot
+    return parsed_program
+
+
+# tokens become (text, line) tuples, which marshal can store
+def _freeze(parsed):
+    return [
+        _freeze(item) if isinstance(item, list) else (str(item), item.line_num)
+        for item in parsed
+    ]
+
+
+def _thaw(frozen):
+    return [
+        _thaw(item) if isinstance(item, list) else StringWithLineNumber(*item)
+        for item in frozen
+    ]
+
+
+def startup_benchmark(runs=5):
+    """
+    Compare startup of this entry point with running the same one-line program
+    after the tester's imports: total import time from -X importtime, number
+    of modules imported and best wall time over runs.
+    """
+    # benchmark-only modules, so a normal run never imports them
+    # pylint: disable=import-outside-toplevel
+    import subprocess
+    import tempfile
+    import time
+
+    here = dirname(abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        program_path = join(directory, "hello.brewin")
+        with open(program_path, "w", encoding="utf-8") as handle:
+            handle.write(BENCHMARK_PROGRAM)
+        commands = {
+            "brewin.py": [join(here, "brewin.py"), program_path],
+            "tester imports": [
+                "-c",
+                "import tester, interpreterv1, sys; "
+                "interpreterv1.Interpreter().run(open(sys.argv[1]).readlines())",
+                program_path,
+            ],
+        }
+        print(f'{"entry point":<16} {"imports ms":>10} {"modules":>8} {"wall ms":>8}')
+        for name, command in commands.items():
+            best_wall, import_us, modules = None, 0, 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                completed = subprocess.run(
+                    [sys.executable, "-X", "importtime", *command],
+                    cwd=here,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                wall = time.perf_counter() - start
+                if best_wall is None or wall < best_wall:
+                    best_wall = wall
+                    import_us, modules = _import_time(completed.stderr)
+            print(
+                f"{name:<16} {import_us / 1000:10.1f} {modules:8d}"
+                f" {best_wall * 1000:8.1f}"
+            )
+    return 0
+
+
+# sums the self times (in us) of -X importtime's report
+def _import_time(report):
+    total, modules = 0, 0
+    for line in report.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or not fields[0][12:].strip().isdigit():
+            continue  # header
+        total += int(fields[0][12:])
+        modules += 1
+    return total, modules
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,373 @@
+"""
+Generates valid Brewin programs of a given size and shape, with matching .in
+and .exp files, for scaling tests of the parser and interpreter. The expected
+output comes from a small evaluator for the generated subset, not from the
+interpreter under test. The same arguments and seed always give the same files.
+
+    python3 brewingen.py --classes 200 --methods 10 --seed 7 --out bench/ --name big
+"""
+
+import argparse
+import random
+import time
+from os import makedirs
+from os.path import join
+
+from bparser import BParser
+
+WORDS = "alpha brew coffee delta espresso grind hello latte mocha roast world".split()
+BLOCK_FORMS = ("class", "method", "begin", "while", "if")
+CALL_GRAPH_SHAPES = ["chain", "tree", "star", "random"]
+MODULUS = 9973  # keeps every generated value a small int
+
+
+class ProgramGenerator:
+    """Builds the program as nested lists, then renders and evaluates it."""
+
+    def __init__(
+        self,
+        classes=10,
+        methods=5,
+        fields=3,
+        depth=2,
+        statements=3,
+        string_density=0.3,
+        call_graph="tree",
+        max_call_depth=40,
+        seed=0,
+    ):
+        self.num_classes = classes
+        self.num_methods = methods
+        self.num_fields = fields
+        self.depth = depth
+        self.statements = statements
+        self.string_density = string_density
+        self.call_graph = call_graph
+        self.max_call_depth = max_call_depth
+        self.rng = random.Random(seed)
+        self.input_value = self.rng.randint(1, 100)
+
+    def generate(self):
+        """Return (program lines, stdin lines, expected output lines)."""
+        children, roots = self.__call_graph()
+        classes = [self.__main_class(roots)]
+        for class_index in range(self.num_classes):
+            classes.append(self.__class(class_index, children))
+        lines = []
+        for class_def in classes:
+            lines += render(class_def, 0)
+            lines.append("")
+        expected = Evaluator(classes, [str(self.input_value)]).run()
+        return [line + "\n" for line in lines], [str(self.input_value)], expected
+
+    # method g (class g // methods, method g % methods) calls children[g];
+    # every edge goes to a higher g, so calls always terminate
+    def __call_graph(self):
+        total = self.num_classes * self.num_methods
+        children = [[] for _ in range(total)]
+        call_depth = [0] * total
+        roots = []
+        for node in range(total):
+            parent = None
+            if node > 0:
+                if self.call_graph == "chain":
+                    parent = node - 1
+                elif self.call_graph == "tree":
+                    parent = (node - 1) // 2
+                elif self.call_graph == "star":
+                    parent = 0
+                else:
+                    parent = self.rng.randrange(node)
+                if call_depth[parent] + 1 >= self.max_call_depth:
+                    parent = None
+            if parent is None:
+                roots.append(node)
+            else:
+                children[parent].append(node)
+                call_depth[node] = call_depth[parent] + 1
+        return children, roots
+
+    def __main_class(self, roots):
+        body = ["begin", ["inputi", "n"]]
+        for root in roots:
+            call = self.__call(-1, root, "n")
+            body.append(["print", '"root "', str(root), '" = "', call])
+        return [
+            "class",
+            "main",
+            ["field", "n", "0"],
+            ["method", "main", [], body],
+        ]
+
+    def __class(self, class_index, children):
+        class_def = ["class", f"c{class_index}"]
+        for field in self.__data_fields() + self.__counter_fields():
+            class_def.append(["field", field, str(self.rng.randint(0, 50))])
+        for method_index in range(self.num_methods):
+            node = class_index * self.num_methods + method_index
+            body = ["begin"] + self.__block(self.depth)
+            for child in children[node]:
+                call = self.__call(class_index, child, self.__expression())
+                body.append(["set", "f0", ["%", ["+", "f0", call], str(MODULUS)]])
+            result = ["%", ["+", "x", self.__expression()], str(MODULUS)]
+            body.append(["return", result])
+            class_def.append(["method", f"m{method_index}", ["x"], body])
+        return class_def
+
+    def __data_fields(self):
+        return [f"f{i}" for i in range(max(1, self.num_fields))]
+
+    def __counter_fields(self):
+        return [f"i{level}" for level in range(self.depth)]
+
+    def __call(self, caller_class, node, argument):
+        callee_class, callee_method = divmod(node, self.num_methods)
+        target = "me" if callee_class == caller_class else ["new", f"c{callee_class}"]
+        return ["call", target, f"m{callee_method}", argument]
+
+    # statements nesting down to the given depth; the first statement of each
+    # block is the nested one, so the deepest level is always reached
+    def __block(self, depth):
+        block = []
+        for index in range(self.statements):
+            if index == 0 and depth > 0:
+                block.append(self.__nested(depth))
+            elif self.rng.random() < self.string_density:
+                block.append(["print", self.__string(), self.__expression()])
+            else:
+                target = self.rng.choice(self.__data_fields())
+                block.append(
+                    ["set", target, ["%", self.__expression(), str(MODULUS)]]
+                )
+        return block
+
+    def __nested(self, depth):
+        level = self.depth - depth
+        kind = self.rng.choice(["begin", "if", "while"])
+        inner = ["begin"] + self.__block(depth - 1)
+        if kind == "begin":
+            return inner
+        if kind == "if":
+            operator = self.rng.choice(["<", ">", "==", "!="])
+            condition = [operator, self.__leaf(), self.__leaf()]
+            return ["if", condition, inner, ["begin"] + self.__block(depth - 1)]
+        counter = f"i{level}"
+        inner.append(["set", counter, ["+", counter, "1"]])
+        loop = ["while", ["<", counter, str(self.rng.randint(1, 3))], inner]
+        return ["begin", ["set", counter, "0"], loop]
+
+    def __expression(self):
+        operator = self.rng.choice(["+", "-", "*", "%"])
+        right = self.__leaf() if operator != "%" else str(self.rng.randint(1, 97))
+        if operator == "*":
+            right = str(self.rng.randint(1, 3))
+        return [operator, self.__leaf(), right]
+
+    def __leaf(self):
+        if self.rng.random() < 0.3:
+            return str(self.rng.randint(0, 20))
+        return self.rng.choice(["x"] + self.__data_fields())
+
+    def __string(self):
+        words = self.rng.sample(WORDS, self.rng.randint(1, 3))
+        return '"' + " ".join(words) + ' "'
+
+
+def render(node, indent):
+    """Brewin source lines for a nested-list node, breaking long block forms."""
+    pad = "  " * indent
+    flat = render_inline(node)
+    if (
+        not isinstance(node, list)
+        or len(pad) + len(flat) <= 80
+        or node[0] not in BLOCK_FORMS
+    ):
+        return [pad + flat]
+    # keyword plus its header (name, parameters or condition) stay on one line
+    header = {"class": 2, "method": 3, "while": 2, "if": 2}.get(node[0], 1)
+    lines = [pad + "(" + " ".join(render_inline(child) for child in node[:header])]
+    for child in node[header:]:
+        lines += render(child, indent + 1)
+    lines[-1] += ")"
+    return lines
+
+
+def render_inline(node):
+    """Single-line rendering of a node."""
+    if not isinstance(node, list):
+        return node
+    return "(" + " ".join(render_inline(child) for child in node) + ")"
+
+
+class Evaluator:
+    """Reference semantics for the generated subset (ints, strings, calls, new)."""
+
+    def __init__(self, classes, stdin):
+        self.classes = {class_def[1]: class_def for class_def in classes}
+        self.stdin = list(stdin)
+        self.output = []
+
+    def run(self):
+        """Run main and return the printed lines."""
+        self.__call(self.__new("main"), "main", [])
+        return self.output
+
+    def __new(self, class_name):
+        fields = {}
+        for item in self.classes[class_name][2:]:
+            if item[0] == "field":
+                fields[item[1]] = int(item[2])
+        return (class_name, fields)
+
+    def __call(self, obj, method_name, args):
+        for item in self.classes[obj[0]][2:]:
+            if item[0] == "method" and item[1] == method_name:
+                frame = dict(zip(item[2], args))
+                return self.__statement(obj, frame, item[3])[1]
+        raise KeyError(method_name)
+
+    # returns (returned, value)
+    def __statement(self, obj, frame, statement):
+        keyword = statement[0]
+        if keyword == "begin":
+            for sub_statement in statement[1:]:
+                result = self.__statement(obj, frame, sub_statement)
+                if result[0]:
+                    return result
+        elif keyword == "set":
+            value = self.__evaluate(obj, frame, statement[2])
+            self.__assign(obj, frame, statement[1], value)
+        elif keyword == "inputi":
+            self.__assign(obj, frame, statement[1], int(self.stdin.pop(0)))
+        elif keyword == "print":
+            terms = [self.__evaluate(obj, frame, term) for term in statement[1:]]
+            self.output.append("".join(str(term) for term in terms))
+        elif keyword == "if":
+            branch = 2 if self.__evaluate(obj, frame, statement[1]) else 3
+            if branch < len(statement):
+                return self.__statement(obj, frame, statement[branch])
+        elif keyword == "while":
+            while self.__evaluate(obj, frame, statement[1]):
+                result = self.__statement(obj, frame, statement[2])
+                if result[0]:
+                    return result
+        elif keyword == "return":
+            return True, self.__evaluate(obj, frame, statement[1])
+        return False, None
+
+    @staticmethod
+    def __assign(obj, frame, name, value):
+        if name in frame:
+            frame[name] = value
+        else:
+            obj[1][name] = value
+
+    def __evaluate(self, obj, frame, expression):
+        if not isinstance(expression, list):
+            if expression.startswith('"'):
+                return expression[1:-1]
+            if expression in frame:
+                return frame[expression]
+            if expression in obj[1]:
+                return obj[1][expression]
+            return int(expression)
+        operator = expression[0]
+        if operator == "call":
+            # like the interpreter: arguments first, then the target object
+            args = [self.__evaluate(obj, frame, arg) for arg in expression[3:]]
+            target = obj
+            if expression[1] != "me":
+                target = self.__evaluate(obj, frame, expression[1])
+            return self.__call(target, expression[2], args)
+        if operator == "new":
+            return self.__new(expression[1])
+        left = self.__evaluate(obj, frame, expression[1])
+        right = self.__evaluate(obj, frame, expression[2])
+        return {
+            "+": lambda: left + right,
+            "-": lambda: left - right,
+            "*": lambda: left * right,
+            "%": lambda: left % right,
+            "<": lambda: left < right,
+            ">": lambda: left > right,
+            "==": lambda: left == right,
+            "!=": lambda: left != right,
+        }[operator]()
+
+
+def write_program(generator, directory, name):
+    """Write name.brewin/.in/.exp into directory; returns the program lines."""
+    program, stdin, expected = generator.generate()
+    makedirs(directory, exist_ok=True)
+    for extension, lines in (
+        ("brewin", program),
+        ("in", [line + "\n" for line in stdin]),
+        ("exp", [line + "\n" for line in expected]),
+    ):
+        path = join(directory, f"{name}.{extension}")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.writelines(lines)
+    return program
+
+
+def benchmark(program, stdin):
+    """Time BParser.parse, loading (eager and lazy) and a full run of program."""
+    import interpreterv1  # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    BParser.parse(program)
+    print(f"parse:        {time.perf_counter() - start:8.3f}s")
+    for lazy in (False, True):
+        interpreter = interpreterv1.Interpreter(False, list(stdin), lazy_load=lazy)
+        start = time.perf_counter()
+        interpreter.run(program)
+        label = "run (lazy):" if lazy else "run (eager):"
+        print(f"{label:<13} {time.perf_counter() - start:8.3f}s")
+
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic Brewin programs."
+    )
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--methods", type=int, default=5, help="methods per class")
+    parser.add_argument("--fields", type=int, default=3, help="data fields per class")
+    parser.add_argument("--depth", type=int, default=2, help="begin/if/while nesting")
+    parser.add_argument(
+        "--statements", type=int, default=3, help="statements per block"
+    )
+    parser.add_argument(
+        "--string-density",
+        type=float,
+        default=0.3,
+        help="fraction of simple statements that print a string literal",
+    )
+    parser.add_argument("--call-graph", choices=CALL_GRAPH_SHAPES, default="tree")
+    parser.add_argument("--max-call-depth", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=".", help="output directory")
+    parser.add_argument("--name", default="test_generated")
+    parser.add_argument(
+        "--bench", action="store_true", help="also time parsing and running it"
+    )
+    args = parser.parse_args()
+    generator = ProgramGenerator(
+        args.classes,
+        args.methods,
+        args.fields,
+        args.depth,
+        args.statements,
+        args.string_density,
+        args.call_graph,
+        args.max_call_depth,
+        args.seed,
+    )
+    program = write_program(generator, args.out, args.name)
+    print(f"Wrote {join(args.out, args.name)}.brewin ({len(program)} lines)")
+    if args.bench:
+        benchmark(program, [str(generator.input_value)])
+
+
+if __name__ == "__main__":
+    main()
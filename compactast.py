@@ -0,0 +1,138 @@
+"""
+Compact parse output. CompactParser.parse accepts the same programs (and
+reports the same errors) as BParser.parse, but instead of nested lists with a
+StringWithLineNumber per token it builds a CompactProgram: each distinct token
+is stored once in a symbol table, lists live in a flat node table, elements are
+integers in an array('i') and line numbers sit in a parallel array('i').
+to_nested() rebuilds BParser's format for code that expects it. The tester's corpus stores programs in this
+format, and interpreterv1's run_parsed (via lazyloader.CompactIndex) rebuilds
+only the members a run uses.
+"""
+
+import re
+import sys
+from array import array
+
+from bparser import BParser, StringWithLineNumber
+
+# string (closed or not), parenthesis or plain token, as BParser splits them
+TOKEN_RE = re.compile(r'"[^"]*"|"|[()]|[^ \t\r\n()"]+')
+
+class CompactProgram:
+    """
+    Flat parse of a program. Elements are encoded as ints: a token is its
+    symbol id (>= 0) and a nested list is ~node (< 0). Node 0 is the program
+    itself; the elements of node n are elements[start[n] : start[n] + length[n]],
+    with line numbers (for lists, the line of the opening parenthesis) at the
+    same positions in lines.
+    """
+
+    ROOT = 0
+
+    def __init__(self):
+        self.symbols = []
+        self.symbol_ids = {}
+        self.elements = array("i")
+        self.lines = array("i")
+        self.start = array("i")
+        self.length = array("i")
+
+    def intern(self, token):
+        """Symbol id of token, adding it to the symbol table if it is new."""
+        symbol = self.symbol_ids.get(token)
+        if symbol is None:
+            symbol = len(self.symbols)
+            token = sys.intern(token)
+            self.symbols.append(token)
+            self.symbol_ids[token] = symbol
+        return symbol
+
+    def children(self, node):
+        """Positions (in elements/lines) of node's elements."""
+        start = self.start[node]
+        return range(start, start + self.length[node])
+
+    def to_nested(self, node=ROOT):
+        """Rebuild node in BParser.parse's nested-list format."""
+        symbols, elements, lines = self.symbols, self.elements, self.lines
+        start, length = self.start, self.length
+
+        # tokens are built without StringWithLineNumber.__new__'s Python frame;
+        # rebuilding is dominated by token creation
+        new_token = str.__new__
+
+        def build(node):
+            begin = start[node]
+            end = begin + length[node]
+            nested = []
+            for element, line in zip(elements[begin:end], lines[begin:end]):
+                if element < 0:
+                    nested.append(build(~element))
+                else:
+                    token = new_token(StringWithLineNumber, symbols[element])
+                    token.line_num = line
+                    nested.append(token)
+            return nested
+
+        return build(node)
+
+
+class CompactParser:
+    """Static class wrapping CompactParser.parse. Do not initialize this class!"""
+
+    @staticmethod
+    def parse(lines):
+        """
+        Same contract as BParser.parse: returns (True, CompactProgram) or
+        (False, error message).
+        """
+        program = CompactProgram()
+        intern = program.intern
+        # per open list: (node, [element, line, element, line, ...])
+        stack = [(CompactProgram.ROOT, [])]
+        CompactParser.__add_node(program)
+        for line_no, line in enumerate(lines):
+            if BParser.COMMENT_CHAR in line:
+                line = CompactParser.__remove_comment(line)
+            for match in TOKEN_RE.finditer(line):
+                token = match.group()
+                if token == BParser.OPEN_PAREN_CHAR:
+                    node = CompactParser.__add_node(program)
+                    stack[-1][1].extend((~node, line_no))
+                    stack.append((node, []))
+                elif token == BParser.CLOSE_PAREN_CHAR:
+                    if len(stack) < 2:
+                        return False, "Extra closing parenthesis"
+                    CompactParser.__close_node(program, *stack.pop())
+                elif token == BParser.QUOTE_CHAR:
+                    return False, "Unclosed string"
+                else:
+                    stack[-1][1].extend((intern(token), line_no))
+        if len(stack) > 1:
+            return False, "Unclosed parenthesis"
+        CompactParser.__close_node(program, *stack.pop())
+        return True, program
+
+    @staticmethod
+    def __add_node(program):
+        program.start.append(0)
+        program.length.append(0)
+        return len(program.start) - 1
+
+    # a list's elements are stored contiguously once it is closed
+    @staticmethod
+    def __close_node(program, node, members):
+        program.start[node] = len(program.elements)
+        program.length[node] = len(members) // 2
+        program.elements.extend(members[0::2])
+        program.lines.extend(members[1::2])
+
+    @staticmethod
+    def __remove_comment(line):
+        in_string = False
+        for index, char in enumerate(line):
+            if char == BParser.COMMENT_CHAR and not in_string:
+                return line[:index]
+            if char == BParser.QUOTE_CHAR:
+                in_string = not in_string
+        return line
@@ -5,9 +5,24 @@ test management.
 
 import asyncio
 import json
+import os
+import sys
+import time
+import tracemalloc
 from os import makedirs
 from os.path import exists
 from abc import ABC, abstractmethod
+from math import sqrt
+from statistics import median
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# sub-millisecond tests jitter by ~2x between runs, so a test only counts as
+# regressed once its CPU time also grew by this much (seconds, single run)
+NOISE_FLOOR = 0.0005
 
 
 class AbstractTestScaffold(ABC):
@@ -22,49 +37,158 @@ class AbstractTestScaffold(ABC):
         """Run the test case end-to-end; return a number encoding the points allocated."""
 
 
-def run_test(scaffold, test_case):
-    """Ran a single test case with the scaffold; returns score."""
+def run_test(scaffold, test_case, metrics=None):
+    """
+    Ran a single test case with the scaffold; returns score. If metrics is a
+    dict, it is updated with any counters the scaffold left in the environment
+    under "metrics" (e.g. interpreter steps).
+    """
     environment = scaffold.setup(test_case)
     try:
         return scaffold.run_test_case(test_case, environment)
     except Exception as exception:  # pylint: disable=broad-except
         print(f"Exception during test: {exception}")
         return 0
+    finally:
+        if metrics is not None and isinstance(environment, dict):
+            metrics.update(environment.get("metrics", {}))
+
+
+def timed_run(scaffold, test_case):
+    """
+    Run a single test case once; returns (score, wall time, CPU time, user
+    time, system time, scaffold metrics).
+    """
+    metrics = {}
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    start_user, start_system = _cpu_usage()
+    score = run_test(scaffold, test_case, metrics)
+    wall_time = time.perf_counter() - start_wall
+    cpu_time = time.thread_time() - start_cpu
+    end_user, end_system = _cpu_usage()
+    return (
+        score,
+        wall_time,
+        cpu_time,
+        end_user - start_user,
+        end_system - start_system,
+        metrics,
+    )
+
+
+def summarize_runs(runs, peak_memory=None):
+    """
+    Lowest score and resource usage of timed_run results: median
+    wall/CPU/user/system time, the tester process' peak RSS so far, the
+    scaffold's metrics from the last run and peak_memory if it was measured.
+    CPU times are per-thread where the platform allows, so they exclude
+    other work.
+    """
+    scores, wall_times, cpu_times, user_times, system_times, metrics = zip(*runs)
+    usage = {
+        "wall_time": median(wall_times),
+        "cpu_time": median(cpu_times),
+        "user_time": median(user_times),
+        "system_time": median(system_times),
+        "repeat": len(runs),
+    }
+    # high-water mark of the whole tester process so far, not of this test
+    max_rss = _max_rss_kb()
+    if max_rss is not None:
+        usage["process_max_rss_kb"] = max_rss
+    usage.update(metrics[-1])
+    if peak_memory is not None:
+        usage["peak_memory"] = peak_memory
+    return min(scores), usage
+
+
+def _cpu_usage():
+    if resource is not None and hasattr(resource, "RUSAGE_THREAD"):
+        usage = resource.getrusage(resource.RUSAGE_THREAD)
+        return usage.ru_utime, usage.ru_stime
+    times = os.times()  # whole process
+    return times.user, times.system
 
 
-async def run_test_wrapper(interpreter, test_case, timeout):
+# process-wide high-water mark; ru_maxrss is in bytes on macOS, KiB elsewhere
+def _max_rss_kb():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def _traced_peak(scaffold, test_case):
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        run_test(scaffold, test_case)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+async def run_test_wrapper(
+    interpreter, test_case, timeout, repeat=1, track_memory=False
+):
     """
-    Wrapper for run_test with timeout and minor debugging.
-    Uses asyncio to enforce timeout, not for concurrency.
+    Run a test case repeat times with timed_run, with timeout and minor
+    debugging; returns the score and resource usage from summarize_runs (None
+    on timeout). Uses asyncio to enforce timeout, not for concurrency. The
+    timeout applies to each run, so the test times out as soon as any one run
+    takes longer than timeout. With track_memory, one extra untimed run under
+    tracemalloc records the peak Python heap usage, so tracing doesn't skew
+    the timings.
     """
     print(f'Running {test_case["srcfile"]}... ', end="")
+    runs, peak_memory = [], None
     try:
-        async with asyncio.timeout(timeout):
-            result = await asyncio.to_thread(run_test, interpreter, test_case)
-            print(f' {"PASSED" if result else "FAILED"}')
-            return result
+        for _ in range(repeat):
+            async with asyncio.timeout(timeout):
+                runs.append(
+                    await asyncio.to_thread(timed_run, interpreter, test_case)
+                )
+        if track_memory:
+            async with asyncio.timeout(timeout):
+                peak_memory = await asyncio.to_thread(
+                    _traced_peak, interpreter, test_case
+                )
     except asyncio.TimeoutError:
         print("TIMED OUT")
-        return 0
+        return 0, None
+    result, timing = summarize_runs(runs, peak_memory)
+    print(f' {"PASSED" if result else "FAILED"}')
+    return result, timing
 
 
-async def run_all_tests(interpreter, tests, timeout_per_test=5):
+async def run_all_tests(
+    interpreter, tests, timeout_per_test=5, repeat=1, track_memory=False
+):
     """
     Run all tests sequentially; defaults to 5s timeout per test.
     Each test case *must* have a name and srcfile key.
+    Resource usage is stored in each result's extra_data.
     """
     print(f"Running {len(tests)} tests...")
-    results = [
-        {
-            "name": test["name"],
-            "score": await run_test_wrapper(interpreter, test, timeout_per_test),
-            "max_score": 1,
-            "visibility": "visible"
-            if test.get("visible", False)
-            else "after_published",
-        }
-        for test in tests
-    ]
+    results = []
+    for test in tests:
+        score, timing = await run_test_wrapper(
+            interpreter, test, timeout_per_test, repeat, track_memory
+        )
+        results.append(
+            {
+                "name": test["name"],
+                "score": score,
+                "max_score": 1,
+                "visibility": "visible"
+                if test.get("visible", False)
+                else "after_published",
+                "extra_data": timing if timing else {"timed_out": True},
+            }
+        )
     print(f"{get_score(results)}/{len(tests)} tests passed.")
     return results
 
@@ -90,3 +214,124 @@ def write_gradescope_output(score, is_prod):
 def get_score(results):
     """Helper to get student's score (for 0/1-based scores.)"""
     return len(list(filter(lambda result: result["score"], results)))
+
+
+def print_slowest_tests(results, count=5, key="wall_time"):
+    """
+    Print the count tests with the highest extra_data[key], with their usage,
+    then the tester process' peak RSS (which is not attributable to a test).
+    """
+    measured = [result for result in results if key in result["extra_data"]]
+    measured.sort(key=lambda result: result["extra_data"][key], reverse=True)
+    if not measured or count <= 0:
+        return
+    print(f"Slowest {min(count, len(measured))} tests by {key}:")
+    print(
+        f'{"test":<50} {"wall ms":>9} {"user ms":>9} {"sys ms":>9}'
+        f' {"steps":>9} {"heap KiB":>9}'
+    )
+    for result in measured[:count]:
+        usage = result["extra_data"]
+        print(
+            f'{result["name"]:<50} {usage["wall_time"] * 1000:9.2f}'
+            f' {usage["user_time"] * 1000:9.2f} {usage["system_time"] * 1000:9.2f}'
+            f' {_column(usage.get("steps"))}'
+            f' {_column(usage.get("peak_memory"), 1024)}'
+        )
+    max_rss = _max_rss_kb()
+    if max_rss is not None:
+        print(f"Peak RSS of the tester process: {max_rss} KiB")
+
+
+def _column(value, scale=1):
+    return f"{value // scale:9d}" if value is not None else f'{"-":>9}'
+
+
+def load_timing_baselines(path):
+    """
+    Load per-test timing baselines written by write_timing_baselines ({} if
+    missing).
+    """
+    if not exists(path):
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def write_timing_baselines(results, path):
+    """Store each test's wall/CPU time as the new baseline."""
+    baselines = {
+        result["name"]: {
+            "wall_time": result["extra_data"]["wall_time"],
+            "cpu_time": result["extra_data"]["cpu_time"],
+        }
+        for result in results
+        if "wall_time" in result["extra_data"]
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(baselines, handle, ensure_ascii=False, indent=4)
+
+
+def compare_timings(results, baselines, max_slowdown, noise_floor=NOISE_FLOOR):
+    """
+    Compare test timings against baselines. A test regresses when its CPU time
+    exceeds max_slowdown times its baseline and grew by more than its noise
+    floor: noise_floor seconds for a single run, divided by the square root
+    of the test's repeat count (medians of more runs jitter less). The suite
+    regresses when its total CPU time exceeds max_slowdown times the total
+    baseline and grew by more than noise_floor. Tests without a baseline (or
+    that timed out) are skipped.
+    """
+    tests, regressions = [], []
+    totals = {"wall_time": [0.0, 0.0], "cpu_time": [0.0, 0.0]}
+    for result in results:
+        baseline = baselines.get(result["name"])
+        timing = result["extra_data"]
+        if baseline is None or "wall_time" not in timing:
+            continue
+        entry = {"name": result["name"]}
+        for metric, total in totals.items():
+            total[0] += baseline[metric]
+            total[1] += timing[metric]
+            entry[metric] = timing[metric]
+            entry[f"{metric}_slowdown"] = _slowdown(baseline[metric], timing[metric])
+        tests.append(entry)
+        test_floor = noise_floor / sqrt(timing.get("repeat", 1))
+        if (
+            entry["cpu_time_slowdown"] > max_slowdown
+            and timing["cpu_time"] - baseline["cpu_time"] > test_floor
+        ):
+            regressions.append(result["name"])
+    aggregate = {metric: _slowdown(*total) for metric, total in totals.items()}
+    return {
+        "tests": tests,
+        "aggregate_slowdown": aggregate,
+        "regressions": regressions,
+        "passed": not regressions
+        and (
+            aggregate["cpu_time"] <= max_slowdown
+            or totals["cpu_time"][1] - totals["cpu_time"][0] <= noise_floor
+        ),
+    }
+
+
+def print_timing_report(report):
+    """Print per-test and aggregate slowdowns from compare_timings."""
+    for entry in report["tests"]:
+        flag = "  REGRESSED" if entry["name"] in report["regressions"] else ""
+        print(
+            f'{entry["name"]:<50} {entry["wall_time"] * 1000:9.2f} ms'
+            f' wall x{entry["wall_time_slowdown"]:.2f}'
+            f' cpu x{entry["cpu_time_slowdown"]:.2f}{flag}'
+        )
+    aggregate = report["aggregate_slowdown"]
+    print(
+        f'Aggregate slowdown: wall x{aggregate["wall_time"]:.2f}, '
+        f'cpu x{aggregate["cpu_time"]:.2f}'
+    )
+    if not report["passed"]:
+        print("Performance regression detected!")
+
+
+def _slowdown(baseline, current):
+    return current / baseline if baseline > 0 else 1.0
@@ -1,56 +1,223 @@
 from intbase import InterpreterBase, ErrorType
 from bparser import BParser, StringWithLineNumber
+from lazyloader import ProgramIndex, CompactIndex, LazyClassTable
+from loopoptimizer import IntegerLoopOptimizer
+from quickening import Quickener, CONSTANT, PARAMETER, FIELD, EXPRESSION
+import gc
 import sys
+import weakref
 
 
 class Interpreter(InterpreterBase):
-    def __init__(self, console_output=True, inp=None, trace_output=False):
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        profile_heap=False,
+        optimize_loops=True,
+        lazy_load=True,
+        quicken=True,
+    ):
         super().__init__(
             console_output, inp
         )  # call InterpreterBase’s constructor
         self.classes_dict = {}
+        self.heap_profiler = HeapProfiler() if profile_heap else None
+        # runs pure integer while loops natively/in closed form
+        self.loop_optimizer = IntegerLoopOptimizer() if optimize_loops else None
+        # build classes on first use and parse methods on first call
+        self.lazy_load = lazy_load
+        # specializes operator sites to the operand types they see
+        self.quickener = Quickener() if quicken else None
+        # state for run_async; reader/writer are asyncio streams (or None)
+        self.reader = None
+        self.writer = None
+        self.yield_every = 100
+        self.steps = 0  # statements executed by the current run
+        # embedding I/O (see load); None means the inp list and output log
+        self.input_iter = None
+        self.on_output = None
 
     def interpret_statement(self, statement, line_num):
         print(f"{line_num}: {statement}")
 
     def run(self, program):
+        self.__start_program()
+        main_obj = self.__load_program(program)
+        if main_obj is None:
+            return SyntaxError
+        main_obj.call_method("main")
+        return
+
+    # runs a program that was already parsed by BParser.parse or
+    # CompactParser.parse (the parse is only read, so it can be shared across
+    # runs); with lazy_load, a CompactProgram is only rebuilt in nested form
+    # one member at a time, as members are used
+    def run_parsed(self, parsed_program):
+        self.__start_program()
+        self.__load_parsed_program(parsed_program).call_method("main")
+
+    # same as run, but executes cooperatively inside an asyncio event loop:
+    # input is read from reader, output is written to writer, and control is
+    # handed back to the loop every yield_every statements
+    async def run_async(self, program, reader=None, writer=None, yield_every=100):
+        self.reader = reader
+        self.writer = writer
+        self.yield_every = yield_every
+        self.__start_program()
+        main_obj = self.__load_program(program)
+        if main_obj is None:
+            return SyntaxError
+        await main_obj.call_method_async("main")
+        return
+
+    async def checkpoint(self):
+        self.steps += 1
+        if self.steps % self.yield_every == 0:
+            # imported here so plain runs don't pay for asyncio; it is
+            # already loaded whenever an event loop is running
+            import asyncio
+
+            await asyncio.sleep(0)
+
+    async def get_input_async(self):
+        if self.reader is None:
+            return self.get_input()
+        line = await self.reader.readline()
+        if not line:
+            return None
+        return line.decode().rstrip("\n")
+
+    async def output_async(self, val):
+        if self.writer is None:
+            self.output(val)
+            return
+        self.output_log.append(val)
+        self.writer.write(f"{val}\n".encode())
+        await self.writer.drain()
+
+    # embedding API: load a program (loading or running another one replaces
+    # it, and its inputs and on_output), then create objects and call their
+    # methods with native int/bool/str values (None for null/no value).
+    # Input is pulled from the inputs iterator, and each print passes its
+    # terms as native values to on_output instead of formatting and logging them.
+    # Errors raise RuntimeError (see get_error_type_and_line): an unknown class
+    # is a TYPE_ERROR, an unknown method a NAME_ERROR
+    def load(self, program, inputs=None, on_output=None):
+        self.__start_program(inputs, on_output)
+        if not self.__load_classes(program):
+            self.error(ErrorType.SYNTAX_ERROR)
+
+    def new_object(self, class_name):
+        class_def = self.__find_definition_for_class(class_name)
+        return class_def.instantiate_object(self.classes_dict, self)
+
+    def call(self, obj, method_name, *args):
+        params = [_from_native(arg) for arg in args]
+        return _to_native(obj.call_method(method_name, params))
+
+    def get_input(self):
+        if self.input_iter is None:
+            return super().get_input()
+        return next(self.input_iter, None)
+
+    # heap instrumentation; only available when built with profile_heap=True
+    def get_heap_stats(self, collect=False):
+        if self.heap_profiler is None:
+            return None
+        return self.heap_profiler.get_stats(collect)
+
+    def heap_report(self, collect=False):
+        if self.heap_profiler is None:
+            return "heap profiling is disabled"
+        return self.heap_profiler.report(collect)
+
+    # forgets the previous program (objects already created keep working) and
+    # sets the embedding I/O, so one instance can run or load several programs
+    def __start_program(self, inputs=None, on_output=None):
+        self.steps = 0
+        self.classes_dict = {}
+        self.parsed_program = None
+        self.input_iter = iter(inputs) if inputs is not None else None
+        self.on_output = on_output
+
+    # parses the program and creates the main object; None on a syntax error
+    def __load_program(self, program):
+        if not self.__load_classes(program):
+            return None
+        class_def = self.__find_definition_for_class("main")
+        return class_def.instantiate_object(self.classes_dict, self)
+
+    # parses the program and tracks its classes; False on a syntax error
+    def __load_classes(self, program):
+        if self.lazy_load:
+            index = ProgramIndex(program)
+            if index.syntax_error:
+                return False
+            if index.supported:
+                self.parsed_program = None
+                self.__track_indexed_classes(index)
+                return True
         # parse the program into a more easily processed form
         result, parsed_program = BParser.parse(program)
         if not result:
-            return SyntaxError
+            return False
         self.parsed_program = parsed_program
         self.__discover_all_classes_and_track_them()
+        return True
+
+    def __load_parsed_program(self, parsed_program):
+        if hasattr(parsed_program, "to_nested"):  # CompactProgram
+            index = CompactIndex(parsed_program) if self.lazy_load else None
+            if index is not None and index.supported:
+                self.parsed_program = None
+                self.__track_indexed_classes(index)
+            else:
+                self.parsed_program = parsed_program.to_nested()
+                self.__discover_all_classes_and_track_them()
+        else:
+            self.parsed_program = parsed_program
+            self.__discover_all_classes_and_track_them()
         class_def = self.__find_definition_for_class("main")
-        obj = class_def.instantiate_object(self.classes_dict, super())
-        obj.call_method("main")
-        return
+        return class_def.instantiate_object(self.classes_dict, self)
 
     def __discover_all_classes_and_track_them(self):
         for class_def in self.parsed_program:
             if class_def[1] in self.classes_dict:
                 super().error(ErrorType(1))
-                sys.exit()
             class_dict = {'fields': {}, 'methods': {}}
             for item in class_def:
                 if item[0] == super().FIELD_DEF:
                     if item[1] in class_dict['fields']:
                         super().error(ErrorType(2))
-                        sys.exit()
                     class_dict['fields'][item[1]] = item[2]
                     # handle a field
                 elif item[0] == super().METHOD_DEF:
                     if item[1] in class_dict['methods']:
                         super().error(ErrorType(2))
-                        sys.exit()
                     class_dict['methods'][item[1]] = Method(item[2], item[3])
                     # handle a method
             self.classes_dict[class_def[1]] = class_dict
 
+    # same checks as __discover_all_classes_and_track_them, on the lazy index
+    def __track_indexed_classes(self, index):
+        class_names = set()
+        for class_info in index.classes:
+            if class_info.name in class_names:
+                super().error(ErrorType(1))
+            class_names.add(class_info.name)
+            member_names = {super().FIELD_DEF: set(), super().METHOD_DEF: set()}
+            for kind, name, _ in class_info.members:
+                if name in member_names[kind]:
+                    super().error(ErrorType(2))
+                member_names[kind].add(name)
+        self.classes_dict = LazyClassTable(index.lines, index.classes)
+
     def __find_definition_for_class(self, c):
         if c not in self.classes_dict:
             super().error(ErrorType(1))
-            sys.exit()
-        return ClassDefinition(self.classes_dict[c])
+        return ClassDefinition(c, self.classes_dict[c])
 
     def print_line_nums(parsed_program):
         for item in parsed_program:
@@ -60,17 +227,20 @@ class Interpreter(InterpreterBase):
 
 class ClassDefinition:
     # constructor for a ClassDefinition
-    def __init__(self, class_dict):
+    def __init__(self, class_name, class_dict):
+        self.class_name = str(class_name)
         self.my_methods = class_dict['methods']
         self.my_fields = class_dict['fields']
 
     # uses the definition of a class to create and return an instance of it
     def instantiate_object(self, classes_dict, base):
-        obj = ObjectDefinition(classes_dict, base)
+        obj = ObjectDefinition(classes_dict, base, self.class_name)
         for method_name, method in self.my_methods.items():
             obj.add_method(method_name, method)
         for f_name, f_value in self.my_fields.items():
             obj.add_field(str(f_name), f_value)
+        if base.heap_profiler is not None:
+            base.heap_profiler.record_allocation(obj)
         return obj
 
 
@@ -87,28 +257,27 @@ class Method:
 
 
 class ObjectDefinition:
-    def __init__(self, classes_dict, base):
+    def __init__(self, classes_dict, base, class_name=None):
         self.super = base
+        self.class_name = class_name
         self.fields = {}
         self.methods = {}
-        self.params = []
         self.classes_dict = classes_dict
 
-    # Interpret the specified method using the provided parameters
-    def call_method(self, method_name, parameters=[]):
-        method = self.__find_method(method_name)
-        params = method.get_parameters()
-        if len(params) != len(parameters):
-            self.super.error(ErrorType(1))
-            sys.exit()
-        new_params = {}
-        for i in range(len(parameters)):
-            new_params[params[i]] = parameters[i]
-        self.params.append(new_params)
+    # Interpret the specified method using the provided parameters. Each call
+    # gets its own frame (parameter name -> value), which is passed down
+    # explicitly, so calls on the same object from different threads (or
+    # re-entrant calls) never share execution state
+    def call_method(self, method_name, parameters=()):
+        method, frame = self.__enter_method(method_name, parameters)
         statement = method.get_top_level_statement()
-        result = self.__run_statement(statement)[0]
-        self.params.pop()
-        return result
+        return self.__run_statement(statement, frame)[0]
+
+    # async counterpart of call_method, used by Interpreter.run_async
+    async def call_method_async(self, method_name, parameters=()):
+        method, frame = self.__enter_method(method_name, parameters)
+        statement = method.get_top_level_statement()
+        return (await self.__run_statement_async(statement, frame))[0]
 
     def add_field(self, f_name, f_value):
         val = self.__convert_string_with_line_number_to_type(f_value)
@@ -120,72 +289,91 @@ class ObjectDefinition:
     def __find_method(self, method_name):
         if method_name not in self.methods:
             self.super.error(ErrorType(2))
-            sys.exit()
         return self.methods[method_name]
 
+    # looks up the method and builds a new frame binding its parameters
+    def __enter_method(self, method_name, parameters):
+        method = self.__find_method(method_name)
+        params = method.get_parameters()
+        if len(params) != len(parameters):
+            self.super.error(ErrorType(1))
+        frame = {}
+        for i in range(len(parameters)):
+            frame[params[i]] = parameters[i]
+        return method, frame
+
     # runs/interprets the passed-in statement until completion and
     # gets the result, if any
-    def __run_statement(self, statement):
+    def __run_statement(self, statement, frame):
+        self.super.steps += 1
         result = None
         returned = False
         if statement[0] == self.super.PRINT_DEF:
-            self.__execute_print_statement(statement)
+            self.__execute_print_statement(statement, frame)
         elif (
             statement[0] == self.super.INPUT_STRING_DEF
             or statement[0] == self.super.INPUT_INT_DEF
         ):
-            self.__execute_input_statement(statement)
+            self.__execute_input_statement(statement, frame)
         elif statement[0] == self.super.SET_DEF:
-            self.__execute_set_statement(statement)
+            self.__execute_set_statement(statement, frame)
         elif statement[0] == self.super.CALL_DEF:
-            self.__execute_call_statement(statement)
+            self.__execute_call_statement(statement, frame)
         elif statement[0] == self.super.WHILE_DEF:
-            result, returned = self.__execute_while_statement(statement)
+            result, returned = self.__execute_while_statement(statement, frame)
         elif statement[0] == self.super.IF_DEF:
-            result, returned = self.__execute_if_statement(statement)
+            result, returned = self.__execute_if_statement(statement, frame)
         elif statement[0] == self.super.RETURN_DEF:
-            result, returned = self.__execute_return_statement(statement)
+            result, returned = self.__execute_return_statement(statement, frame)
         elif statement[0] == self.super.BEGIN_DEF:
             (
                 result,
                 returned,
-            ) = self.__execute_all_sub_statements_of_begin_statement(statement)
+            ) = self.__execute_all_sub_statements_of_begin_statement(statement, frame)
         return result, returned
 
-    def __execute_all_sub_statements_of_begin_statement(self, statement):
+    def __execute_all_sub_statements_of_begin_statement(self, statement, frame):
         for state in statement:
             if state == self.super.BEGIN_DEF:
                 continue
-            res, returned = self.__run_statement(state)
+            res, returned = self.__run_statement(state, frame)
             if res is not None or returned:
                 return res, returned
         return None, None
 
-    def __execute_print_statement(self, statement):
+    def __execute_print_statement(self, statement, frame):
+        if self.super.on_output is not None:
+            self.super.on_output(
+                *[
+                    _to_native(self.__evaluate_expression(term, frame))
+                    for term in statement
+                    if term != self.super.PRINT_DEF
+                ]
+            )
+            return
         output = ''
         for term in statement:
             if term == self.super.PRINT_DEF:
                 continue
-            raw_txt = term
-            txt = self.__evaluate_expression(raw_txt)
-            if (
-                isinstance(txt, str)
-                and txt.startswith('"')
-                and txt.endswith('"')
-            ):
-                txt = txt[1:-1]
-            elif isinstance(txt, bool):
-                if txt:
-                    txt = self.super.TRUE_DEF
-                else:
-                    txt = self.super.FALSE_DEF
-            output += str(txt)
+            output += self.__format_print_term(self.__evaluate_expression(term, frame))
         self.super.output(output)
 
-    def __execute_input_statement(self, statement):
-        input = self.super.get_input()
-        if statement[1] in self.params[-1]:
-            self.params[-1][statement[1]] = (
+    def __format_print_term(self, txt):
+        if isinstance(txt, str) and txt.startswith('"') and txt.endswith('"'):
+            txt = txt[1:-1]
+        elif isinstance(txt, bool):
+            if txt:
+                txt = self.super.TRUE_DEF
+            else:
+                txt = self.super.FALSE_DEF
+        return str(txt)
+
+    def __execute_input_statement(self, statement, frame):
+        self.__assign_input(statement, self.super.get_input(), frame)
+
+    def __assign_input(self, statement, input, frame):
+        if statement[1] in frame:
+            frame[statement[1]] = (
                 int(input)
                 if statement[0] == self.super.INPUT_INT_DEF
                 else str(input)
@@ -198,59 +386,66 @@ class ObjectDefinition:
             )
         else:
             self.super.error(ErrorType(2))
-            sys.exit()
 
-    def __execute_call_statement(self, statement):
-        params = [self.__evaluate_expression(param) for param in statement[3:]]
+    def __execute_call_statement(self, statement, frame):
+        params = [self.__evaluate_expression(param, frame) for param in statement[3:]]
         if statement[1] == self.super.ME_DEF:
             return self.call_method(statement[2], params)
-        obj = self.__evaluate_expression(statement[1])
+        obj = self.__evaluate_expression(statement[1], frame)
         if type(obj) is Nothing:
             self.super.error(ErrorType(4))
         res = obj.call_method(statement[2], params)
         return res
 
-    def __execute_while_statement(self, statement):
-        condition = self.__evaluate_expression(statement[1])
-        if type(condition) is not bool:
-            self.super.error(ErrorType(1))
-            sys.exit()
+    def __execute_while_statement(self, statement, frame):
+        optimizer = self.super.loop_optimizer
+        if optimizer is not None:
+            # count the statements the optimized loop stood in for
+            steps = optimizer.try_execute(statement, frame, self.fields)
+            if steps is not None:
+                self.super.steps += steps
+                return None, None
+        condition = self.__evaluate_condition(statement[1], frame)
         while condition:
-            res, returned = self.__run_statement(statement[2])
+            res, returned = self.__run_statement(statement[2], frame)
             if res is not None or returned:
                 return res, returned
-            condition = self.__evaluate_expression(statement[1])
-            if type(condition) is not bool:
-                self.super.error(ErrorType(1))
-                sys.exit()
+            condition = self.__evaluate_condition(statement[1], frame)
         return None, None
 
-    def __execute_if_statement(self, statement):
-        condition = self.__evaluate_expression(statement[1])
-        # print(condition, type(condition), type(condition) is not bool)
+    def __evaluate_condition(self, expression, frame):
+        return self.__check_condition(self.__evaluate_expression(expression, frame))
+
+    def __check_condition(self, condition):
         if type(condition) is not bool:
             self.super.error(ErrorType(1))
-            sys.exit()
+        return condition
+
+    def __execute_if_statement(self, statement, frame):
+        condition = self.__evaluate_condition(statement[1], frame)
         if condition:
-            return self.__run_statement(statement[2])
+            return self.__run_statement(statement[2], frame)
         elif len(statement) == 4:
-            return self.__run_statement(statement[3])
+            return self.__run_statement(statement[3], frame)
         return None, None
 
-    def __execute_return_statement(self, statement):
+    def __execute_return_statement(self, statement, frame):
         if len(statement) == 2:
-            return self.__evaluate_expression(statement[1]), True
+            return self.__evaluate_expression(statement[1], frame), True
         return None, True
 
-    def __execute_set_statement(self, statement):
-        val = self.__evaluate_expression(statement[2])
-        if statement[1] in self.params[-1]:
-            self.params[-1][statement[1]] = val
-        elif statement[1] in self.fields:
-            self.fields[statement[1]] = val
+    def __execute_set_statement(self, statement, frame):
+        self.__assign_variable(
+            statement[1], self.__evaluate_expression(statement[2], frame), frame
+        )
+
+    def __assign_variable(self, name, val, frame):
+        if name in frame:
+            frame[name] = val
+        elif name in self.fields:
+            self.fields[name] = val
         else:
             self.super.error(ErrorType(2))
-            sys.exit()
 
     def __convert_string_with_line_number_to_type(self, value):
         if type(value) != StringWithLineNumber:
@@ -269,38 +464,104 @@ class ObjectDefinition:
             if str(value) in self.classes_dict:
                 return str(value)
             self.super.error(ErrorType(2))
-            sys.exit()
 
-    def __evaluate_expression(self, expression):
+    def __evaluate_expression(self, expression, frame):
         if type(expression) != list:
-            expr = expression
-            if expression in self.fields:
-                expr = self.fields[expression]
-            if self.params and expression in self.params[-1]:
-                expr = self.params[-1][expression]
-            return self.__convert_string_with_line_number_to_type(expr)
+            return self.__evaluate_variable_or_constant(expression, frame)
         operator = expression[0]
         if operator == self.super.CALL_DEF:
-            return self.__execute_call_statement(expression)
+            return self.__execute_call_statement(expression, frame)
         elif operator == self.super.NEW_DEF:
-            if expression[1] not in self.classes_dict:
-                self.super.error(ErrorType(1))
-                sys.exit()
-            class_def = ClassDefinition(self.classes_dict[expression[1]])
-            obj = class_def.instantiate_object(self.classes_dict, self.super)
-            return obj
-        op1 = self.__evaluate_expression(expression[1])
-        op1 = self.__convert_string_with_line_number_to_type(op1)
+            return self.__instantiate(expression[1])
+        quickener = self.super.quickener
+        if quickener is not None and operator != '!':
+            # quickened site (see quickening.py); evaluated inline so nested
+            # expressions cost no extra Python frames
+            site = quickener.site(expression)
+            # read once: another thread may swap it while this one evaluates
+            specialization = site.specialization
+            if specialization is None:
+                op1 = self.__evaluate_expression(expression[1], frame)
+                op2 = self.__evaluate_expression(expression[2], frame)
+                return self.__apply_and_observe(site, op1, op2, frame)
+            fn, type1, type2, kind1, operand1, kind2, operand2 = specialization
+            op1 = (
+                self.__evaluate_expression(operand1, frame)
+                if kind1 is EXPRESSION
+                else self.__fetch_operand(kind1, operand1, frame)
+            )
+            op2 = (
+                self.__evaluate_expression(operand2, frame)
+                if kind2 is EXPRESSION
+                else self.__fetch_operand(kind2, operand2, frame)
+            )
+            if type(op1) is type1 and type(op2) is type2:
+                return fn(op1, op2)
+            site.deoptimize()
+            return self.__apply_and_observe(site, op1, op2, frame)
+        op1 = self.__evaluate_expression(expression[1], frame)
+        if operator == '!':
+            return self.__apply_operator(operator, op1, None)
+        op2 = self.__evaluate_expression(expression[2], frame)
+        return self.__apply_operator(operator, op1, op2)
+
+    def __evaluate_variable_or_constant(self, expression, frame):
+        expr = expression
+        if expression in self.fields:
+            expr = self.fields[expression]
+        if expression in frame:
+            expr = frame[expression]
+        return self.__convert_string_with_line_number_to_type(expr)
+
+    def __instantiate(self, class_name):
+        if class_name not in self.classes_dict:
+            self.super.error(ErrorType(1))
+        class_def = ClassDefinition(class_name, self.classes_dict[class_name])
+        obj = class_def.instantiate_object(self.classes_dict, self.super)
+        return obj
+
+    # generic evaluation of a quickened site, feeding its type feedback
+    def __apply_and_observe(self, site, op1, op2, frame):
+        result = self.__apply_operator(site.operator, op1, op2)
+        fn = site.observe(type(op1), type(op2))
+        if fn is not None:
+            site.specialize(
+                fn,
+                type(op1),
+                type(op2),
+                self.__describe_operand(site.expression[1], frame),
+                self.__describe_operand(site.expression[2], frame),
+            )
+        return result
+
+    def __fetch_operand(self, kind, operand, frame):
+        if kind is CONSTANT:
+            return operand
+        if kind is PARAMETER:
+            return frame[operand]
+        return self.fields[operand]
+
+    # parameters shadow fields, as in __evaluate_variable_or_constant
+    def __describe_operand(self, operand, frame):
+        if type(operand) is list:
+            return EXPRESSION, operand
+        if operand in frame:
+            return PARAMETER, operand
+        if operand in self.fields:
+            return FIELD, operand
+        value = self.__convert_string_with_line_number_to_type(operand)
+        if type(value) in (int, bool, str):
+            return CONSTANT, value
+        return EXPRESSION, operand
+
+    # applies operator to already-evaluated operands (op2 is None for '!')
+    def __apply_operator(self, operator, op1, op2):
         t1 = type(op1)
         if operator == '!':
             if t1 is not bool:
                 self.super.error(ErrorType(1))
-                sys.exit()
             return not t1
-        op2 = self.__evaluate_expression(expression[2])
-        op2 = self.__convert_string_with_line_number_to_type(op2)
         t2 = type(op2)
-        # print(operator, op1, t1, op2, t2)
         if operator == '+':
             if (
                 t1 is not t2
@@ -308,7 +569,6 @@ class ObjectDefinition:
                 and not isinstance(op1, str)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             if isinstance(op1, int):
                 return op1 + op2
             if op1.endswith('"'):
@@ -319,22 +579,18 @@ class ObjectDefinition:
         elif operator == '-':
             if not isinstance(op1, int) or not isinstance(op2, int):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 - op2
         elif operator == '%':
             if not isinstance(op1, int) or not isinstance(op2, int):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 % op2
         elif operator == '*':
             if not isinstance(op1, int) or not isinstance(op2, int):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 * op2
         elif operator == '/':
             if not isinstance(op1, int) or not isinstance(op2, int):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 // op2
         elif operator == '==':
             if (
@@ -343,7 +599,6 @@ class ObjectDefinition:
                 and (t1 is not ObjectDefinition or t2 is not Nothing)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             if t1 is Nothing or t2 is Nothing:
                 return t1 == t2
             return op1 == op2
@@ -354,7 +609,6 @@ class ObjectDefinition:
                 and (t1 is not ObjectDefinition or t2 is not Nothing)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             if t1 is Nothing or t2 is Nothing:
                 return t1 != t2
             return op1 != op2
@@ -365,7 +619,6 @@ class ObjectDefinition:
                 and not isinstance(op1, str)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 >= op2
         elif operator == '<=':
             if (
@@ -374,7 +627,6 @@ class ObjectDefinition:
                 and not isinstance(op1, str)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 <= op2
         elif operator == '>':
             if (
@@ -383,7 +635,6 @@ class ObjectDefinition:
                 and not isinstance(op1, str)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 > op2
         elif operator == '<':
             if (
@@ -392,25 +643,200 @@ class ObjectDefinition:
                 and not isinstance(op1, str)
             ):
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 < op2
         elif operator == '&':
             if t1 is not bool or t2 is not bool:
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 and op2
         elif operator == '|':
             if t1 is not bool or t2 is not bool:
                 self.super.error(ErrorType(1))
-                sys.exit()
             return op1 or op2
 
+    # async counterparts of the statement/expression runners above; they
+    # share the operator, assignment and formatting helpers, and only differ
+    # in awaiting I/O, calls and the interpreter's scheduling checkpoint
+    async def __run_statement_async(self, statement, frame):
+        await self.super.checkpoint()
+        result = None
+        returned = False
+        if statement[0] == self.super.PRINT_DEF:
+            output = ''
+            for term in statement[1:]:
+                val = await self.__evaluate_expression_async(term, frame)
+                output += self.__format_print_term(val)
+            await self.super.output_async(output)
+        elif (
+            statement[0] == self.super.INPUT_STRING_DEF
+            or statement[0] == self.super.INPUT_INT_DEF
+        ):
+            self.__assign_input(
+                statement, await self.super.get_input_async(), frame
+            )
+        elif statement[0] == self.super.SET_DEF:
+            val = await self.__evaluate_expression_async(statement[2], frame)
+            self.__assign_variable(statement[1], val, frame)
+        elif statement[0] == self.super.CALL_DEF:
+            await self.__execute_call_statement_async(statement, frame)
+        elif statement[0] == self.super.WHILE_DEF:
+            result, returned = await self.__execute_while_statement_async(
+                statement, frame
+            )
+        elif statement[0] == self.super.IF_DEF:
+            condition = self.__check_condition(
+                await self.__evaluate_expression_async(statement[1], frame)
+            )
+            if condition:
+                result, returned = await self.__run_statement_async(statement[2], frame)
+            elif len(statement) == 4:
+                result, returned = await self.__run_statement_async(statement[3], frame)
+            else:
+                result, returned = None, None
+        elif statement[0] == self.super.RETURN_DEF:
+            if len(statement) == 2:
+                result = await self.__evaluate_expression_async(statement[1], frame)
+            returned = True
+        elif statement[0] == self.super.BEGIN_DEF:
+            for state in statement[1:]:
+                result, returned = await self.__run_statement_async(state, frame)
+                if result is not None or returned:
+                    break
+        return result, returned
+
+    async def __execute_call_statement_async(self, statement, frame):
+        params = [
+            await self.__evaluate_expression_async(param, frame)
+            for param in statement[3:]
+        ]
+        if statement[1] == self.super.ME_DEF:
+            return await self.call_method_async(statement[2], params)
+        obj = await self.__evaluate_expression_async(statement[1], frame)
+        if type(obj) is Nothing:
+            self.super.error(ErrorType(4))
+        return await obj.call_method_async(statement[2], params)
+
+    async def __execute_while_statement_async(self, statement, frame):
+        condition = self.__check_condition(
+            await self.__evaluate_expression_async(statement[1], frame)
+        )
+        while condition:
+            res, returned = await self.__run_statement_async(statement[2], frame)
+            if res is not None or returned:
+                return res, returned
+            condition = self.__check_condition(
+                await self.__evaluate_expression_async(statement[1], frame)
+            )
+        return None, None
+
+    async def __evaluate_expression_async(self, expression, frame):
+        if type(expression) != list:
+            return self.__evaluate_variable_or_constant(expression, frame)
+        operator = expression[0]
+        if operator == self.super.CALL_DEF:
+            return await self.__execute_call_statement_async(expression, frame)
+        elif operator == self.super.NEW_DEF:
+            return self.__instantiate(expression[1])
+        op1 = await self.__evaluate_expression_async(expression[1], frame)
+        if operator == '!':
+            return self.__apply_operator(operator, op1, None)
+        op2 = await self.__evaluate_expression_async(expression[2], frame)
+        return self.__apply_operator(operator, op1, op2)
+
+
+# Counts Brewin object allocations per class and tracks the live heap through
+# weak references, so objects are never kept alive by the profiler itself
+class HeapProfiler:
+    def __init__(self):
+        self.allocations = {}
+        self.live_objects = weakref.WeakSet()
+        self.peak_live = 0
+
+    def record_allocation(self, obj):
+        self.allocations[obj.class_name] = (
+            self.allocations.get(obj.class_name, 0) + 1
+        )
+        self.live_objects.add(obj)
+        self.peak_live = max(self.peak_live, len(self.live_objects))
+
+    # class name -> live count and estimated bytes; collect=True runs the
+    # cycle collector first so unreachable cyclic objects aren't counted
+    def snapshot(self, collect=False):
+        if collect:
+            gc.collect()
+        heap = {}
+        for obj in list(self.live_objects):
+            entry = heap.setdefault(obj.class_name, {'count': 0, 'bytes': 0})
+            entry['count'] += 1
+            entry['bytes'] += HeapProfiler.estimate_size(obj)
+        return heap
+
+    # shallow estimate: the object, its containers and its non-object fields
+    @staticmethod
+    def estimate_size(obj):
+        size = sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+        size += sys.getsizeof(obj.fields) + sys.getsizeof(obj.methods)
+        for val in obj.fields.values():
+            if type(val) is not ObjectDefinition:
+                size += sys.getsizeof(val)
+        return size
+
+    # the snapshot (and its collection) comes first, so live_objects agrees
+    # with heap; the peak is the most objects alive at once, counting cyclic
+    # garbage the collector hadn't reclaimed at that point
+    def get_stats(self, collect=False):
+        heap = self.snapshot(collect)
+        live = sum(entry['count'] for entry in heap.values())
+        self.peak_live = max(self.peak_live, live)
+        return {
+            'allocations': dict(self.allocations),
+            'total_allocations': sum(self.allocations.values()),
+            'live_objects': live,
+            'peak_live_objects': self.peak_live,
+            'heap': heap,
+        }
+
+    def report(self, collect=False):
+        stats = self.get_stats(collect)
+        lines = [f"{'class':<20} {'allocated':>10} {'live':>8} {'est. bytes':>12}"]
+        for class_name, count in sorted(
+            stats['allocations'].items(), key=lambda item: -item[1]
+        ):
+            live = stats['heap'].get(class_name, {'count': 0, 'bytes': 0})
+            lines.append(
+                f"{class_name:<20} {count:>10} {live['count']:>8} {live['bytes']:>12}"
+            )
+        lines.append(
+            f"total allocated: {stats['total_allocations']}, "
+            f"live: {stats['live_objects']}, peak live: {stats['peak_live_objects']}"
+        )
+        return "\n".join(lines)
+
 
 class Nothing:
     def __init__(self):
         pass
 
 
+# Brewin string values keep their quotes (input strings don't); objects pass
+# through both ways
+def _to_native(value):
+    if type(value) is str and value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    if type(value) is Nothing:
+        return None
+    return value
+
+
+def _from_native(value):
+    if type(value) is str:
+        return f'"{value}"'
+    if value is None:
+        return Nothing()
+    if type(value) in (int, bool) or type(value) is ObjectDefinition:
+        return value
+    raise TypeError(f"unsupported Brewin value: {value!r}")
+
+
 def main():
     program = """(class main
   (field num 0)
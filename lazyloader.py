@@ -0,0 +1,369 @@
+"""
+Lazy program loading. ProgramIndex scans the source once with a regex
+tokenizer, without building tokens, and records where each class and each of
+its fields/methods starts and ends. Classes are only built when first used
+(LazyClassTable), and a method is only parsed when first called (LazyMethod),
+so load time grows with the code a run touches rather than the program size.
+CompactIndex does the same for a CompactProgram (compactast.py), reading the
+node table instead of the source and rebuilding members in BParser's format
+only when they are used. FormCache splits a program into its top-level forms
+the same way as ProgramIndex, so editing one class and re-parsing only runs
+BParser on the forms that changed.
+"""
+
+import re
+
+from bparser import BParser, StringWithLineNumber
+from intbase import InterpreterBase
+
+# string (closed or not), comment or parenthesis, as BParser splits them; the
+# plain tokens between two of these are only looked at near the top level
+DELIMITER_RE = re.compile(r'"[^"]*"|"|#|[()]')
+ATOM_RE = re.compile(r'[^ \t\r\n()"#]+')
+
+
+class Span:
+    """Source region of one parenthesized form (line numbers are 0-based)."""
+
+    def __init__(self, start_line, start_col, end_line, end_col):
+        self.start_line = start_line
+        self.start_col = start_col
+        self.end_line = end_line
+        self.end_col = end_col
+
+    def parse(self, lines):
+        """Parse just this form with BParser, keeping its original line numbers."""
+        if self.start_line == self.end_line:
+            text = [lines[self.start_line][self.start_col : self.end_col + 1]]
+        else:
+            text = [lines[self.start_line][self.start_col :]]
+            text += lines[self.start_line + 1 : self.end_line]
+            text.append(lines[self.end_line][: self.end_col + 1])
+        _, parsed = BParser.parse(text)
+        _shift_line_numbers(parsed, self.start_line)
+        return parsed[0]
+
+
+class IndexedClass:
+    """A class' name and the spans of its members, in source order."""
+
+    def __init__(self, name):
+        self.name = name
+        self.members = []  # (FIELD_DEF or METHOD_DEF, name, Span)
+
+
+class ProgramIndex:
+    """Class/member spans for a program, or why it can't be loaded lazily."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.classes = []
+        self.syntax_error = None  # same message BParser.parse would return
+        self.supported = True  # False if the program needs the eager loader
+        self.__scan()
+
+    def __scan(self):
+        # each open list: [start line, start col, element count, head, name]
+        stack = []
+        for line_no, line in enumerate(self.lines):
+            pos = 0
+            for match in DELIMITER_RE.finditer(line):
+                token = match.group()
+                if len(stack) < 3:
+                    for atom in ATOM_RE.findall(line, pos, match.start()):
+                        self.__add_element(stack, atom)
+                pos = match.end()
+                if token == "#":
+                    break
+                if token == '"':
+                    self.syntax_error = "Unclosed string"
+                    return
+                if token == BParser.OPEN_PAREN_CHAR:
+                    if stack:
+                        stack[-1][2] += 1
+                    else:
+                        self.classes.append(IndexedClass(None))
+                    stack.append([line_no, match.start(), 0, None, None])
+                elif token == BParser.CLOSE_PAREN_CHAR:
+                    if not stack:
+                        self.syntax_error = "Extra closing parenthesis"
+                        return
+                    form = stack.pop()
+                    span = Span(form[0], form[1], line_no, match.start())
+                    self.__close_form(form, span, len(stack))
+                elif len(stack) < 3:
+                    self.__add_element(stack, token)
+            else:
+                if len(stack) < 3:
+                    for atom in ATOM_RE.findall(line, pos):
+                        self.__add_element(stack, atom)
+        if stack:
+            self.syntax_error = "Unclosed parenthesis"
+
+    def __add_element(self, stack, token):
+        if not stack:
+            self.supported = False  # top-level token
+            return
+        form = stack[-1]
+        form[2] += 1
+        if form[2] == 1:
+            form[3] = token
+        elif form[2] == 2:
+            form[4] = token
+
+    # the name/head slots stay None when that element is a list
+    def __close_form(self, form, span, depth):
+        _, _, count, head, name = form
+        if depth == 0:
+            if count < 2 or name is None:
+                self.supported = False
+            self.classes[-1].name = name
+        elif depth == 1:
+            if count == 0:
+                self.supported = False  # eager discovery fails on ()
+            elif head in (InterpreterBase.FIELD_DEF, InterpreterBase.METHOD_DEF):
+                needed = 3 if head == InterpreterBase.FIELD_DEF else 4
+                if count < needed or name is None:
+                    self.supported = False
+                else:
+                    self.classes[-1].members.append((head, name, span))
+
+
+class NodeSpan:
+    """One node of a CompactProgram, standing in for a Span."""
+
+    def __init__(self, node):
+        self.node = node
+
+    def parse(self, program):
+        """The node in BParser.parse's format (program takes the place of lines)."""
+        return program.to_nested(self.node)
+
+
+class CompactIndex:
+    """
+    ProgramIndex for a CompactProgram. Its lines are the program itself and
+    its members are NodeSpans, so LazyClassTable and LazyMethod rebuild only
+    the members a run uses. A CompactProgram exists only if parsing
+    succeeded, so syntax_error is always None.
+    """
+
+    def __init__(self, program):
+        self.lines = program
+        self.classes = []
+        self.syntax_error = None
+        self.supported = True  # False if the program needs the eager loader
+        self.__scan(program)
+
+    # same fallback rules as ProgramIndex, applied to the node table
+    def __scan(self, program):
+        symbols, elements, start = program.symbols, program.elements, program.start
+        for position in program.children(program.ROOT):
+            if elements[position] >= 0:
+                self.supported = False  # top-level token
+                return
+            members = program.children(~elements[position])
+            if len(members) < 2 or elements[members[1]] < 0:
+                self.supported = False
+                return
+            indexed = IndexedClass(symbols[elements[members[1]]])
+            for member in members:
+                if elements[member] >= 0:
+                    continue  # tokens are ignored, as by the eager loader
+                node = ~elements[member]
+                count = program.length[node]
+                if count == 0:
+                    self.supported = False  # eager discovery fails on ()
+                    return
+                head = elements[start[node]]
+                kind = symbols[head] if head >= 0 else None
+                if kind not in (InterpreterBase.FIELD_DEF, InterpreterBase.METHOD_DEF):
+                    continue
+                needed = 3 if kind == InterpreterBase.FIELD_DEF else 4
+                name = elements[start[node] + 1] if count > 1 else -1
+                if count < needed or name < 0:
+                    self.supported = False
+                    return
+                indexed.members.append((kind, symbols[name], NodeSpan(node)))
+            self.classes.append(indexed)
+
+
+class LazyMethod:
+    """Stands in for interpreterv1.Method; parses the method on first use."""
+
+    def __init__(self, lines, span):
+        self.lines = lines
+        self.span = span
+        self.parameters = None
+        self.top_statement = None
+
+    # lines is cleared only after both results are set, so a thread racing
+    # this one at worst parses the method again
+    def __materialize(self):
+        lines = self.lines
+        if lines is None:
+            return
+        item = self.span.parse(lines)
+        self.parameters = item[2]
+        self.top_statement = item[3]
+        self.lines = None
+
+    def get_top_level_statement(self):
+        if self.lines is not None:
+            self.__materialize()
+        return self.top_statement
+
+    def get_parameters(self):
+        if self.lines is not None:
+            self.__materialize()
+        return self.parameters
+
+
+class LazyClassTable(dict):
+    """
+    classes_dict whose values ({'fields': ..., 'methods': ...}) are built on
+    first lookup; membership tests never build anything.
+    """
+
+    def __init__(self, lines, indexed_classes):
+        super().__init__()
+        self.lines = lines
+        self.indexed = {}
+        for info in indexed_classes:
+            self.indexed[info.name] = info
+            dict.__setitem__(self, info.name, None)
+
+    def __getitem__(self, name):
+        class_dict = dict.__getitem__(self, name)
+        if class_dict is None:
+            info = self.indexed.get(name)
+            if info is None:  # another thread built it meanwhile
+                return dict.__getitem__(self, name)
+            class_dict = self.__materialize(info)
+            dict.__setitem__(self, name, class_dict)
+            self.indexed.pop(name, None)
+        return class_dict
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def __materialize(self, info):
+        class_dict = {"fields": {}, "methods": {}}
+        for kind, name, span in info.members:
+            if kind == InterpreterBase.FIELD_DEF:
+                class_dict["fields"][name] = span.parse(self.lines)[2]
+            else:
+                class_dict["methods"][name] = LazyMethod(self.lines, span)
+        return class_dict
+
+
+class FormCache:
+    """
+    Parses successive versions of one program. Each top-level form is keyed
+    by its source text, so a re-parse only runs BParser on forms that changed;
+    unchanged forms are reused, with their line numbers shifted in place if
+    they moved (so forms of an earlier result can change). Results match
+    BParser.parse.
+    """
+
+    def __init__(self):
+        self.forms = {}  # form text (tuple of line slices) -> (start line, form)
+
+    def parse(self, lines):
+        """Same contract as BParser.parse."""
+        spans, syntax_error, top_level_atoms = _split_top_level(lines)
+        if syntax_error is not None:
+            return False, syntax_error
+        if top_level_atoms or not self.forms:
+            status, parsed = BParser.parse(lines)
+            if status and not top_level_atoms:
+                self.forms = {
+                    self.__text(lines, span): (span.start_line, form)
+                    for span, form in zip(spans, parsed)
+                }
+            return status, parsed
+        forms = {}
+        parsed = []
+        for span in spans:
+            text = self.__text(lines, span)
+            if text in forms:  # duplicate form; don't share one list twice
+                form = _shifted_copy(forms[text][1], span.start_line - forms[text][0])
+            elif text in self.forms:
+                start_line, form = self.forms.pop(text)
+                if start_line != span.start_line:
+                    _shift_line_numbers(form, span.start_line - start_line)
+            else:
+                form = span.parse(lines)
+            forms.setdefault(text, (span.start_line, form))
+            parsed.append(form)
+        self.forms = forms
+        return True, parsed
+
+    @staticmethod
+    def __text(lines, span):
+        if span.start_line == span.end_line:
+            return (lines[span.start_line][span.start_col : span.end_col + 1],)
+        return (
+            lines[span.start_line][span.start_col :],
+            *lines[span.start_line + 1 : span.end_line],
+            lines[span.end_line][: span.end_col + 1],
+        )
+
+
+# (spans of the top-level forms, BParser's error or None, any top-level tokens?)
+def _split_top_level(lines):
+    spans = []
+    top_level_atoms = False
+    depth = 0
+    start = None
+    for line_no, line in enumerate(lines):
+        # fast path: no strings or comments, and the form can't close here
+        closes = line.count(BParser.CLOSE_PAREN_CHAR)
+        if depth > closes and '"' not in line and "#" not in line:
+            depth += line.count(BParser.OPEN_PAREN_CHAR) - closes
+            continue
+        pos = 0
+        for match in DELIMITER_RE.finditer(line):
+            token = match.group()
+            if depth == 0 and ATOM_RE.search(line, pos, match.start()):
+                top_level_atoms = True
+            pos = match.end()
+            if token == "#":
+                break
+            if token == '"':
+                return spans, "Unclosed string", top_level_atoms
+            if token == BParser.OPEN_PAREN_CHAR:
+                if depth == 0:
+                    start = (line_no, match.start())
+                depth += 1
+            elif token == BParser.CLOSE_PAREN_CHAR:
+                if depth == 0:
+                    return spans, "Extra closing parenthesis", top_level_atoms
+                depth -= 1
+                if depth == 0:
+                    spans.append(Span(*start, line_no, match.start()))
+            elif depth == 0:
+                top_level_atoms = True  # string literal
+        else:
+            if depth == 0 and ATOM_RE.search(line, pos):
+                top_level_atoms = True
+    if depth:
+        return spans, "Unclosed parenthesis", top_level_atoms
+    return spans, None, top_level_atoms
+
+
+def _shifted_copy(parsed, offset):
+    return [
+        _shifted_copy(item, offset)
+        if isinstance(item, list)
+        else StringWithLineNumber(item, item.line_num + offset)
+        for item in parsed
+    ]
+
+
+def _shift_line_numbers(parsed, offset):
+    for item in parsed:
+        if isinstance(item, list):
+            _shift_line_numbers(item, offset)
+        else:
+            item.line_num += offset
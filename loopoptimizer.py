@@ -0,0 +1,313 @@
+"""
+Optimizer for pure integer counting loops. A while loop qualifies when its
+condition is a comparison and its body only sets variables to +, -, *, /, %
+expressions over variables and integer constants. Qualifying loops run either
+in closed form (counter steps by a constant, other variables accumulate an
+invariant or the counter) or as a compiled native Python loop; anything else,
+including any non-int value at run time, falls back to the interpreter.
+Either way the number of iterations is known, so callers can still account
+for the statements the loop body would have executed.
+"""
+
+from intbase import InterpreterBase
+
+ARITHMETIC_OPERATORS = {"+": "+", "-": "-", "*": "*", "/": "//", "%": "%"}
+COMPARISON_OPERATORS = {
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+    "==": "==",
+    "!=": "!=",
+}
+FLIPPED_COMPARISONS = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+class LoopPlan:
+    """Analysis of a single qualifying while statement."""
+
+    def __init__(self, names, assigned, body_statements, native_loop, closed_form):
+        self.names = names  # every variable the loop reads or writes
+        self.assigned = assigned  # variables the body sets, in statement order
+        self.body_statements = body_statements  # sets and begins per iteration
+        self.native_loop = native_loop  # returns its trip count
+        self.closed_form = closed_form  # ClosedForm or None
+
+
+class ClosedForm:
+    """
+    Counter stepped by a constant; every other variable adds an invariant or
+    the counter.
+    """
+
+    def __init__(self, counter, operator, bound, step, updates):
+        self.counter = counter
+        self.operator = operator  # counter <operator> bound
+        self.bound = bound  # compiled invariant expression
+        self.step = step
+        self.updates = updates  # [(name, sign, compiled invariant or None, offset)]
+
+
+class IntegerLoopOptimizer:
+    """Caches a LoopPlan (or None) per while statement and executes plans."""
+
+    def __init__(self):
+        self.plans = {}
+
+    def try_execute(self, statement, frame, fields):
+        """
+        Run the while statement on the variables in frame (the current call's
+        parameters) and fields if it qualifies. Returns how many statements
+        interpreting the loop body would have executed, or None if the caller
+        must interpret the loop instead.
+        """
+        key = id(statement)
+        if key not in self.plans:
+            self.plans[key] = (statement, self.__analyze(statement))
+        plan = self.plans[key][1]
+        if plan is None:
+            return None
+        env = {}
+        for name in plan.names:
+            if name in frame:
+                val = frame[name]
+            elif name in fields:
+                val = fields[name]
+            else:
+                return None
+            if type(val) is not int:
+                return None
+            env[name] = val
+        trips = None
+        if plan.closed_form is not None:
+            trips = self.__run_closed_form(plan.closed_form, env)
+        if trips is None:
+            trips = plan.native_loop(env)
+        for name in plan.assigned:
+            if name in frame:
+                frame[name] = env[name]
+            else:
+                fields[name] = env[name]
+        return trips * plan.body_statements
+
+    def __analyze(self, statement):
+        if len(statement) != 3 or not isinstance(statement[1], list):
+            return None
+        condition = statement[1]
+        if (
+            len(condition) != 3
+            or condition[0] not in COMPARISON_OPERATORS
+            or not _is_int_expression(condition[1])
+            or not _is_int_expression(condition[2])
+        ):
+            return None
+        sets = _flatten_sets(statement[2])
+        if not sets:
+            return None
+        names = []
+        assigned = []
+        for node in [condition] + [expr for _, expr in sets]:
+            _collect_names(node, names)
+        for name, _ in sets:
+            if _parse_int(name) is not None:
+                return None
+            if name not in names:
+                names.append(name)
+            if name not in assigned:
+                assigned.append(name)
+        return LoopPlan(
+            names,
+            assigned,
+            _count_statements(statement[2]),
+            _compile_native_loop(names, assigned, condition, sets),
+            _analyze_closed_form(names, assigned, condition, sets),
+        )
+
+    # returns the trip count, or None if the native loop must run instead
+    @staticmethod
+    def __run_closed_form(form, env):
+        start, step = env[form.counter], form.step
+        bound = form.bound(env)
+        operator = form.operator
+        # normalize to "counter moves towards bound"; otherwise the loop either
+        # never runs or never stops, and the native loop reproduces both
+        if operator in ("<", "<=") and step > 0:
+            distance = bound - start
+        elif operator in (">", ">=") and step < 0:
+            distance, step = start - bound, -step
+        else:
+            return None
+        if operator in ("<", ">"):
+            trips = max(0, -(-distance // step))
+        else:
+            trips = max(0, distance // step + 1)
+        if trips == 0:
+            return 0
+        counter_step = form.step
+        for name, sign, invariant, offset in form.updates:
+            if invariant is not None:
+                env[name] += sign * invariant(env) * trips
+            else:
+                series = trips * (start + offset) + counter_step * (
+                    trips * (trips - 1) // 2
+                )
+                env[name] += sign * series
+        env[form.counter] = start + counter_step * trips
+        return trips
+
+
+def _parse_int(token):
+    try:
+        return int(token)
+    except ValueError:
+        return None
+
+
+def _is_int_expression(node):
+    if isinstance(node, list):
+        return (
+            len(node) == 3
+            and node[0] in ARITHMETIC_OPERATORS
+            and _is_int_expression(node[1])
+            and _is_int_expression(node[2])
+        )
+    if _parse_int(node) is not None:
+        return True
+    return not node.startswith('"') and node not in (
+        InterpreterBase.TRUE_DEF,
+        InterpreterBase.FALSE_DEF,
+        InterpreterBase.NULL_DEF,
+        InterpreterBase.ME_DEF,
+    )
+
+
+# body must be a set, or a (possibly nested) begin of sets only
+def _flatten_sets(statement):
+    if not isinstance(statement, list) or not statement:
+        return None
+    if statement[0] == InterpreterBase.SET_DEF:
+        if len(statement) != 3 or isinstance(statement[1], list):
+            return None
+        if not _is_int_expression(statement[2]):
+            return None
+        return [(str(statement[1]), statement[2])]
+    if statement[0] == InterpreterBase.BEGIN_DEF:
+        sets = []
+        for sub_statement in statement[1:]:
+            sub_sets = _flatten_sets(sub_statement)
+            if sub_sets is None:
+                return None
+            sets += sub_sets
+        return sets
+    return None
+
+
+# statements the interpreter runs per iteration of a (validated) loop body
+def _count_statements(statement):
+    if statement[0] == InterpreterBase.BEGIN_DEF:
+        return 1 + sum(_count_statements(sub) for sub in statement[1:])
+    return 1
+
+
+def _collect_names(node, names):
+    if isinstance(node, list):
+        _collect_names(node[1], names)
+        _collect_names(node[2], names)
+    elif _parse_int(node) is None and str(node) not in names:
+        names.append(str(node))
+
+
+def _references(node, assigned):
+    if isinstance(node, list):
+        return _references(node[1], assigned) or _references(node[2], assigned)
+    return str(node) in assigned
+
+
+# variables become Python locals v0, v1, ... since Brewin names needn't be identifiers
+def _to_python(node, local_names):
+    if isinstance(node, list):
+        left = _to_python(node[1], local_names)
+        right = _to_python(node[2], local_names)
+        return f"({left} {ARITHMETIC_OPERATORS.get(node[0], node[0])} {right})"
+    value = _parse_int(node)
+    if value is not None:
+        return repr(value)
+    return local_names[str(node)]
+
+
+def _compile(source, name):
+    namespace = {}
+    exec(compile(source, f"<brewin loop {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def _compile_native_loop(names, assigned, condition, sets):
+    local_names = {name: f"v{i}" for i, name in enumerate(names)}
+    lines = ["def native_loop(env):"]
+    for name in names:
+        lines.append(f"    {local_names[name]} = env[{name!r}]")
+    comparison = (
+        f"{_to_python(condition[1], local_names)} "
+        f"{COMPARISON_OPERATORS[condition[0]]} "
+        f"{_to_python(condition[2], local_names)}"
+    )
+    lines.append("    trips = 0")
+    lines.append(f"    while {comparison}:")
+    for name, expr in sets:
+        lines.append(f"        {local_names[name]} = {_to_python(expr, local_names)}")
+    lines.append("        trips += 1")
+    for name in assigned:
+        lines.append(f"    env[{name!r}] = {local_names[name]}")
+    lines.append("    return trips")
+    return _compile("\n".join(lines), "native_loop")
+
+
+def _compile_invariant(node, names):
+    local_names = {name: f"env[{name!r}]" for name in names}
+    return _compile(
+        f"def invariant(env):\n    return {_to_python(node, local_names)}",
+        "invariant",
+    )
+
+
+def _analyze_closed_form(names, assigned, condition, sets):
+    operator, left, right = condition
+    if isinstance(left, list) or str(left) not in assigned:
+        if operator not in FLIPPED_COMPARISONS:
+            return None
+        operator, left, right = FLIPPED_COMPARISONS[operator], right, left
+    if operator not in FLIPPED_COMPARISONS or isinstance(left, list):
+        return None
+    counter = str(left)
+    if counter not in assigned or _references(right, assigned):
+        return None
+    if len(set(name for name, _ in sets)) != len(sets):
+        return None
+
+    step = None
+    counter_seen = False
+    updates = []
+    for name, expr in sets:
+        if not isinstance(expr, list) or expr[0] not in ("+", "-"):
+            return None
+        sign = 1 if expr[0] == "+" else -1
+        if str(expr[1]) == name and not isinstance(expr[1], list):
+            other = expr[2]
+        elif expr[0] == "+" and str(expr[2]) == name and not isinstance(expr[2], list):
+            other = expr[1]
+        else:
+            return None
+        if name == counter:
+            if isinstance(other, list) or _parse_int(other) in (None, 0):
+                return None
+            step = sign * _parse_int(other)
+            counter_seen = True
+        elif not isinstance(other, list) and str(other) == counter:
+            updates.append((name, sign, None, step if counter_seen else 0))
+        elif _references(other, assigned):
+            return None
+        else:
+            updates.append((name, sign, _compile_invariant(other, names), 0))
+    return ClosedForm(
+        counter, operator, _compile_invariant(right, names), step, updates
+    )
@@ -0,0 +1,142 @@
+"""
+Adaptive type specialization ("quickening") of operator sites. Every binary
+operator expression records the operand types it sees; once a site has seen
+the same pair WARMUP times in a row and there is a specialized implementation
+for it (int arithmetic/comparison, string concatenation/comparison, bool
+logic), the site switches to that implementation behind an exact-type guard.
+Specialized sites also resolve their operands once: a literal becomes a cached
+constant and a name a direct parameter or field lookup (a site always runs in
+the same method of the same class, so what a name refers to never changes).
+A failed guard de-optimizes the site back to the generic path; a site that
+de-optimizes MAX_DEOPTS times (or has nothing to specialize to) stays generic.
+A site's specialization is one tuple that is replaced as a whole, never
+mutated, so threads sharing a site always see a consistent guard; races on
+the warm-up counters can only delay or repeat a specialization.
+"""
+
+import operator
+
+WARMUP = 8
+MAX_DEOPTS = 2
+
+# how a specialized site fetches an operand
+CONSTANT = 0  # converted literal
+PARAMETER = 1  # name in the current frame
+FIELD = 2  # name in the object's fields
+EXPRESSION = 3  # anything else, evaluated generically
+
+
+# same as the generic '+' on strings: values keep their quotes
+def _concat(op1, op2):
+    if op1.endswith('"'):
+        op1 = op1[:-1]
+    if op2.startswith('"'):
+        op2 = op2[1:]
+    return op1 + op2
+
+
+def _and(op1, op2):
+    return op1 and op2
+
+
+def _or(op1, op2):
+    return op1 or op2
+
+
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# (operator, type of op1, type of op2) -> implementation; only pairs whose
+# generic result is exactly the Python operation (so no bool arithmetic)
+SPECIALIZATIONS = {
+    ("+", int, int): operator.add,
+    ("-", int, int): operator.sub,
+    ("*", int, int): operator.mul,
+    ("/", int, int): operator.floordiv,
+    ("%", int, int): operator.mod,
+    ("+", str, str): _concat,
+    ("&", bool, bool): _and,
+    ("|", bool, bool): _or,
+}
+for _name, _compare in COMPARISONS.items():
+    SPECIALIZATIONS[(_name, int, int)] = _compare
+    SPECIALIZATIONS[(_name, str, str)] = _compare
+SPECIALIZATIONS[("==", bool, bool)] = operator.eq
+SPECIALIZATIONS[("!=", bool, bool)] = operator.ne
+
+
+class OperatorSite:
+    """Type feedback and current specialization for one operator expression."""
+
+    __slots__ = (
+        "expression",
+        "operator",
+        "type1",
+        "type2",
+        "hits",
+        "deopts",
+        "specialization",
+    )
+
+    def __init__(self, expression):
+        self.expression = expression  # keeps the id used as key alive
+        self.operator = expression[0]
+        self.type1 = None  # pair being warmed up
+        self.type2 = None
+        self.hits = 0
+        self.deopts = 0
+        # None, or (implementation, type1, type2, kind1, operand1, kind2, operand2)
+        self.specialization = None
+
+    def observe(self, type1, type2):
+        """
+        Record one generic evaluation; returns the implementation to
+        specialize to once the pair has warmed up (the caller then passes it
+        to specialize with its operands), otherwise None.
+        """
+        if self.deopts >= MAX_DEOPTS:
+            return None
+        if type1 is self.type1 and type2 is self.type2:
+            self.hits += 1
+        else:
+            self.type1, self.type2, self.hits = type1, type2, 1
+        if self.hits < WARMUP:
+            return None
+        implementation = SPECIALIZATIONS.get((self.operator, type1, type2))
+        if implementation is None:
+            self.deopts = MAX_DEOPTS
+        return implementation
+
+    def specialize(self, implementation, type1, type2, operand1, operand2):
+        """
+        Install implementation behind a (type1, type2) guard; operand1 and
+        operand2 say how operands are fetched: (kind, constant/name/expression).
+        """
+        self.specialization = (implementation, type1, type2, *operand1, *operand2)
+
+    def deoptimize(self):
+        """Drop the specialization after a guard failure."""
+        self.specialization = None
+        self.type1 = self.type2 = None
+        self.hits = 0
+        self.deopts += 1
+
+
+class Quickener:
+    """Operator sites keyed by the id of their expression list."""
+
+    def __init__(self):
+        self.sites = {}
+
+    def site(self, expression):
+        """The OperatorSite for expression, created on first use."""
+        site = self.sites.get(id(expression))
+        if site is None:
+            site = self.sites[id(expression)] = OperatorSite(expression)
+        return site
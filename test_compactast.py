@@ -0,0 +1,107 @@
+"""
+Checks that CompactParser round-trips to BParser.parse's output (tokens, line
+numbers and error messages) and that interpreterv1 runs a CompactProgram like
+the source it came from. Run with python3 -m unittest.
+"""
+
+import glob
+import unittest
+from os.path import dirname, exists, join
+
+import interpreterv1
+from bparser import BParser
+from brewingen import ProgramGenerator
+from compactast import CompactParser
+
+PROGRAMS = sorted(glob.glob(join(dirname(__file__), "v1", "*", "*.brewin")))
+
+MALFORMED = [
+    ['(class main (method main () (print "hi")))', ")"],
+    ["(class main", '  (method main () (print "unclosed))', ")"],
+    ["(class main (method main () (print 1))"],
+    ["(class main # ) closes nothing", ")"],
+    ['(class main (field s "a # b" ) (field t "(") )'],
+    ["x (class main) y", ""],
+]
+
+
+def _assert_same(test, expected, actual):
+    test.assertIs(type(actual), type(expected))
+    if isinstance(expected, list):
+        test.assertEqual(len(actual), len(expected))
+        for expected_item, actual_item in zip(expected, actual):
+            _assert_same(test, expected_item, actual_item)
+    else:
+        test.assertEqual(
+            (str(actual), actual.line_num), (str(expected), expected.line_num)
+        )
+
+
+def _run(program, inp, parsed=None, lazy_load=True):
+    interpreter = interpreterv1.Interpreter(False, list(inp), lazy_load=lazy_load)
+    try:
+        if parsed is None:
+            interpreter.run(program)
+        else:
+            interpreter.run_parsed(parsed)
+    except Exception as exception:  # pylint: disable=broad-except
+        return type(exception), interpreter.get_error_type_and_line()[0]
+    return interpreter.get_output()
+
+
+def _read(path):
+    if not exists(path):
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return handle.read().splitlines()
+
+
+class RoundTripTest(unittest.TestCase):
+    """to_nested() must rebuild exactly what BParser.parse returns."""
+
+    def check(self, lines):
+        expected_status, expected = BParser.parse(lines)
+        status, program = CompactParser.parse(lines)
+        self.assertEqual(status, expected_status)
+        if not status:
+            self.assertEqual(program, expected)  # error message
+            return
+        _assert_same(self, expected, program.to_nested())
+
+    def test_test_programs(self):
+        for path in PROGRAMS:
+            with self.subTest(path=path), open(path, encoding="utf-8") as handle:
+                self.check(handle.readlines())
+
+    def test_generated_program(self):
+        program, _, _ = ProgramGenerator(classes=20, methods=4, seed=3).generate()
+        self.check(program)
+
+    def test_malformed_programs(self):
+        for lines in MALFORMED:
+            with self.subTest(lines=lines):
+                self.check([line + "\n" for line in lines])
+
+
+class RunParsedTest(unittest.TestCase):
+    """run_parsed(CompactProgram) behaves like run(source), lazily or eagerly."""
+
+    def test_test_programs(self):
+        for path in PROGRAMS:
+            with self.subTest(path=path), open(path, encoding="utf-8") as handle:
+                program = handle.readlines()
+            inp = _read(path[: -len(".brewin")] + ".in")
+            expected = _run(program, inp)
+            _, parsed = CompactParser.parse(program)
+            for lazy_load in (True, False):
+                self.assertEqual(_run(program, inp, parsed, lazy_load), expected)
+
+    def test_generated_program(self):
+        generator = ProgramGenerator(classes=20, methods=4, seed=5)
+        program, inp, expected = generator.generate()
+        _, parsed = CompactParser.parse(program)
+        self.assertEqual(_run(program, inp, parsed), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
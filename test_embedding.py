@@ -0,0 +1,197 @@
+"""
+Checks for interpreterv1's embedding API (load, new_object and call). Run with
+python3 -m unittest.
+"""
+
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import interpreterv1
+from intbase import ErrorType
+
+COUNTER = [
+    "(class counter",
+    "  (field count 0)",
+    "  (field name null)",
+    "  (method bump (n) (begin (set count (+ count n)) (return count)))",
+    "  (method ask ()",
+    '    (begin (inputi count) (inputs name) (print name " has " count)))',
+    "  (method echo (value) (return value))",
+    "  (method is_null (value) (return (== value null))))",
+]
+
+GREETER = [
+    "(class greeter",
+    '  (method greet (name) (begin (print "greeting " name) (return (+ "hi " name)))))',
+]
+
+
+class EmbeddingTest(unittest.TestCase):
+    """Host code drives a loaded program with native values."""
+
+    def setUp(self):
+        self.interpreter = interpreterv1.Interpreter(False)
+        self.printed = []
+        self.interpreter.load(
+            COUNTER,
+            inputs=iter([3, "bob"]),
+            on_output=lambda *values: self.printed.append(values),
+        )
+        self.counter = self.interpreter.new_object("counter")
+
+    def test_values_round_trip(self):
+        for value in (0, -7, 12345, "", "hi there", True, False, None):
+            with self.subTest(value=value):
+                result = self.interpreter.call(self.counter, "echo", value)
+                self.assertIs(type(result), type(value))
+                self.assertEqual(result, value)
+        self.assertIs(self.interpreter.call(self.counter, "is_null", None), True)
+        result = self.interpreter.call(self.counter, "is_null", self.counter)
+        self.assertIs(result, False)
+        echoed = self.interpreter.call(self.counter, "echo", self.counter)
+        self.assertIs(echoed, self.counter)
+
+    def test_objects_keep_their_state(self):
+        self.assertEqual(self.interpreter.call(self.counter, "bump", 5), 5)
+        self.assertEqual(self.interpreter.call(self.counter, "bump", 2), 7)
+        other = self.interpreter.new_object("counter")
+        self.assertEqual(self.interpreter.call(other, "bump", 1), 1)
+
+    def test_input_and_output(self):
+        self.assertIsNone(self.interpreter.call(self.counter, "ask"))
+        self.assertEqual(self.printed, [("bob", " has ", 3)])
+        self.assertEqual(self.interpreter.get_output(), [])
+        self.assertEqual(self.interpreter.call(self.counter, "bump", 1), 4)
+
+    def test_unknown_class(self):
+        with self.assertRaises(RuntimeError):
+            self.interpreter.new_object("missing")
+        self.assertEqual(
+            self.interpreter.get_error_type_and_line()[0], ErrorType.TYPE_ERROR
+        )
+
+    def test_unknown_method(self):
+        with self.assertRaises(RuntimeError):
+            self.interpreter.call(self.counter, "missing")
+        self.assertEqual(
+            self.interpreter.get_error_type_and_line()[0], ErrorType.NAME_ERROR
+        )
+
+    def test_wrong_argument_count(self):
+        with self.assertRaises(RuntimeError):
+            self.interpreter.call(self.counter, "bump")
+        self.assertEqual(
+            self.interpreter.get_error_type_and_line()[0], ErrorType.TYPE_ERROR
+        )
+
+    def test_unsupported_value(self):
+        with self.assertRaises(TypeError):
+            self.interpreter.call(self.counter, "echo", 1.5)
+
+    def test_load_replaces_the_program(self):
+        self.interpreter.call(self.counter, "bump", 5)
+        greeted = []
+        self.interpreter.load(
+            GREETER, on_output=lambda *values: greeted.append(values)
+        )
+        greeter = self.interpreter.new_object("greeter")
+        self.assertEqual(self.interpreter.call(greeter, "greet", "ann"), "hi ann")
+        self.assertEqual(greeted, [("greeting ", "ann")])
+        self.assertEqual(self.printed, [])
+        with self.assertRaises(RuntimeError):
+            self.interpreter.new_object("counter")
+        # objects of the earlier program keep working
+        self.assertEqual(self.interpreter.call(self.counter, "bump", 1), 6)
+
+# every method only uses its parameters, so concurrent calls can't race
+RECURSIVE = [
+    "(class math",
+    "  (field nobody null)",
+    "  (method fib (n)",
+    "    (if (< n 2) (return n)",
+    "      (return (+ (call me fib (- n 1)) (call me fib (- n 2))))))",
+    "  (method sum_to (n)",
+    "    (if (== n 0) (return 0) (return (+ n (call me sum_to (- n 1))))))",
+    "  (method fail_at (n)",
+    '    (if (== n 0) (return (+ n "x")) (return (call me fail_at (- n 1)))))',
+    "  (method fault_at (n)",
+    "    (if (== n 0) (call nobody fib 1) (call me fault_at (- n 1))))",
+    "  (method report (n) (begin (print n) (return (call me sum_to n)))))",
+]
+
+FIBONACCI = [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610]
+
+
+class ConcurrentCallTest(unittest.TestCase):
+    """One Interpreter and one object serve concurrent and re-entrant calls."""
+
+    def setUp(self):
+        # switch threads as often as possible so calls really interleave
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        self.interpreter = interpreterv1.Interpreter(False)
+        self.interpreter.load(RECURSIVE)
+        self.math = self.interpreter.new_object("math")
+
+    def call(self, method, *args):
+        return self.interpreter.call(self.math, method, *args)
+
+    def test_threads_share_an_object(self):
+        def work(seed):
+            results = []
+            for n in range(seed % 4, len(FIBONACCI), 3):
+                results.append((self.call("fib", n), self.call("sum_to", n * 5)))
+            return seed, results
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for seed, results in executor.map(work, range(32)):
+                expected = [
+                    (FIBONACCI[n], n * 5 * (n * 5 + 1) // 2)
+                    for n in range(seed % 4, len(FIBONACCI), 3)
+                ]
+                self.assertEqual(results, expected)
+
+    def test_errors_raise_in_the_calling_thread(self):
+        def work(n):
+            outcomes = []
+            for method in ("fail_at", "fault_at", "sum_to"):
+                try:
+                    outcomes.append(self.call(method, n))
+                except RuntimeError as error:
+                    outcomes.append(str(error))
+            return outcomes
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for n, outcomes in zip(range(16), executor.map(work, range(16))):
+                self.assertEqual(
+                    outcomes,
+                    [
+                        str(ErrorType.TYPE_ERROR),
+                        str(ErrorType.FAULT_ERROR),
+                        n * (n + 1) // 2,
+                    ],
+                )
+        # the interpreter still works after the errors
+        self.assertEqual(self.call("fib", 10), 55)
+
+    def test_calls_from_inside_a_call(self):
+        nested = []
+
+        def on_output(n):
+            # re-enters the interpreter while report is still running
+            nested.append(self.call("fib", n))
+            if n > 0:
+                nested.append(self.call("report", n - 1))
+
+        self.interpreter.load(RECURSIVE, on_output=on_output)
+        self.assertEqual(self.call("report", 4), 10)
+        # fib(4), fib(3), ..., fib(0), then report(0), ..., report(3) returning
+        self.assertEqual(nested, [3, 2, 1, 1, 0, 0, 1, 3, 6])
+        with self.assertRaises(RuntimeError):
+            self.call("fail_at", 3)
+        self.assertEqual(self.call("sum_to", 3), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
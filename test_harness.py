@@ -0,0 +1,96 @@
+"""
+Checks for the timing side of harness.py: the baseline regression gate and
+per-run timeouts. Run with python3 -m unittest.
+"""
+
+import asyncio
+import time
+import unittest
+
+from harness import AbstractTestScaffold, compare_timings, run_test_wrapper
+
+
+def _result(name, cpu_time, repeat=1):
+    return {
+        "name": name,
+        "extra_data": {"wall_time": cpu_time, "cpu_time": cpu_time, "repeat": repeat},
+    }
+
+
+def _baselines(**cpu_times):
+    return {
+        name: {"wall_time": cpu_time, "cpu_time": cpu_time}
+        for name, cpu_time in cpu_times.items()
+    }
+
+
+class SleepingScaffold(AbstractTestScaffold):
+    """Scaffold whose runs sleep for the given durations, in order."""
+
+    def __init__(self, durations):
+        self.durations = list(durations)
+
+    def setup(self, test_case):
+        return {}
+
+    def run_test_case(self, test_case, environment):
+        time.sleep(self.durations.pop(0))
+        return 1
+
+
+class CompareTimingsTest(unittest.TestCase):
+    """compare_timings must catch real slowdowns of sub-millisecond tests."""
+
+    def test_tenfold_slowdown_of_sub_millisecond_test_fails(self):
+        report = compare_timings(
+            [_result("recursion", 0.004)], _baselines(recursion=0.0004), 1.5
+        )
+        self.assertEqual(report["regressions"], ["recursion"])
+        self.assertFalse(report["passed"])
+
+    def test_tenfold_slowdown_of_suite_fails(self):
+        names = [f"test{i}" for i in range(30)]
+        report = compare_timings(
+            [_result(name, 0.003) for name in names],
+            _baselines(**{name: 0.0003 for name in names}),
+            1.5,
+        )
+        self.assertAlmostEqual(report["aggregate_slowdown"]["cpu_time"], 10.0)
+        self.assertFalse(report["passed"])
+
+    def test_jitter_below_noise_floor_passes(self):
+        report = compare_timings(
+            [_result("print", 0.0002)], _baselines(print=0.0001), 1.5
+        )
+        self.assertEqual(report["regressions"], [])
+        self.assertTrue(report["passed"])
+
+    def test_noise_floor_shrinks_with_repeat(self):
+        baselines = _baselines(loop=0.0004)
+        single = compare_timings([_result("loop", 0.0008)], baselines, 1.5)
+        repeated = compare_timings([_result("loop", 0.0008, 25)], baselines, 1.5)
+        self.assertTrue(single["passed"])
+        self.assertEqual(repeated["regressions"], ["loop"])
+
+
+class RunTestWrapperTest(unittest.TestCase):
+    """The timeout applies to each run, not to all of a test's runs together."""
+
+    def test_one_slow_run_times_out(self):
+        scaffold = SleepingScaffold([0, 0.3, 0])
+        score, timing = asyncio.run(
+            run_test_wrapper(scaffold, {"srcfile": "slow"}, 0.1, repeat=3)
+        )
+        self.assertEqual((score, timing), (0, None))
+
+    def test_fast_runs_pass(self):
+        scaffold = SleepingScaffold([0, 0, 0])
+        score, timing = asyncio.run(
+            run_test_wrapper(scaffold, {"srcfile": "fast"}, 0.1, repeat=3)
+        )
+        self.assertEqual(score, 1)
+        self.assertEqual(timing["repeat"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+Checks for interpreterv1 features that the .brewin suite can't observe.
+Run with python3 -m unittest.
+"""
+
+import asyncio
+import gc
+import unittest
+from os.path import dirname, join
+
+import interpreterv1
+from intbase import ErrorType
+from quickening import WARMUP
+
+
+def _counting_program(label, count):
+    return [
+        "(class main",
+        "  (field i 0)",
+        "  (method main ()",
+        f"    (while (< i {count})",
+        f'      (begin (print "{label}" i) (set i (+ i 1))))))',
+    ]
+
+
+INFINITE_LOOP = [
+    "(class main",
+    "  (field i 0)",
+    "  (method main () (while true (set i (+ i 1)))))",
+]
+
+
+# 50 nodes that each point to themselves; only the last stays reachable
+SELF_REFERENCING_NODES = [
+    "(class node",
+    "  (field self_ref null)",
+    "  (method link (other) (set self_ref other)))",
+    "(class main",
+    "  (field n null)",
+    "  (field i 0)",
+    "  (method main ()",
+    "    (while (< i 50)",
+    "      (begin (set n (new node)) (call n link n) (set i (+ i 1))))))",
+]
+
+
+class _Writer:
+    """asyncio StreamWriter stand-in recording (label, line) in a shared log."""
+
+    def __init__(self, label, log):
+        self.label = label
+        self.log = log
+
+    def write(self, data):
+        self.log.append((self.label, data.decode().rstrip("\n")))
+
+    async def drain(self):
+        pass
+
+
+class AsyncRunTest(unittest.TestCase):
+    """run_async yields to the event loop and can be cancelled."""
+
+    def test_programs_interleave_and_match_run(self):
+        log = []
+        programs = {"a": _counting_program("a", 5), "b": _counting_program("b", 5)}
+        interpreters = {label: interpreterv1.Interpreter(False) for label in programs}
+
+        async def run_both():
+            await asyncio.gather(
+                *(
+                    interpreters[label].run_async(
+                        program, writer=_Writer(label, log), yield_every=1
+                    )
+                    for label, program in programs.items()
+                )
+            )
+
+        asyncio.run(run_both())
+        labels = [label for label, _ in log]
+        switches = [first != second for first, second in zip(labels, labels[1:])]
+        self.assertGreater(sum(switches), 1)
+        for label, program in programs.items():
+            interpreter = interpreterv1.Interpreter(False)
+            interpreter.run(program)
+            self.assertEqual(interpreters[label].get_output(), interpreter.get_output())
+            self.assertEqual(
+                [line for written, line in log if written == label],
+                interpreter.get_output(),
+            )
+
+    def test_timeout_stops_an_infinite_loop(self):
+        interpreter = interpreterv1.Interpreter(False)
+
+        async def run_with_timeout():
+            await asyncio.wait_for(
+                interpreter.run_async(INFINITE_LOOP, yield_every=10), 0.05
+            )
+
+        with self.assertRaises(TimeoutError):
+            asyncio.run(run_with_timeout())
+
+    def test_cancellation_propagates(self):
+        interpreter = interpreterv1.Interpreter(False)
+
+        async def run_and_cancel():
+            task = asyncio.create_task(interpreter.run_async(INFINITE_LOOP))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await task
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(run_and_cancel())
+        self.assertGreater(interpreter.steps, 0)
+
+
+class LoopOptimizerTest(unittest.TestCase):
+    """Optimized loops count the statements they stand in for."""
+
+    def check(self, program):
+        runs = []
+        for optimize_loops in (True, False):
+            interpreter = interpreterv1.Interpreter(
+                False, optimize_loops=optimize_loops
+            )
+            interpreter.run(program)
+            runs.append((interpreter.get_output(), interpreter.steps))
+        self.assertEqual(runs[0], runs[1])
+
+    def test_steps_match_interpreted_loops(self):
+        path = join(dirname(__file__), "v1", "tests", "test_while_sum.brewin")
+        with open(path, encoding="utf-8") as handle:
+            self.check(handle.readlines())
+
+    def test_loop_that_never_runs(self):
+        self.check(
+            [
+                "(class main",
+                "  (field i 5)",
+                "  (method main ()",
+                "    (begin (while (< i 0) (set i (+ i 1))) (print i))))",
+            ]
+        )
+
+
+OPERATOR_SITES = [
+    "(class ops",
+    "  (field total 0)",
+    "  (method add (a b) (return (+ a b)))",
+    "  (method less (a b) (return (< a b)))",
+    "  (method both (a b) (return (& a b)))",
+    "  (method bump (n) (begin (set total (+ total n)) (return total))))",
+]
+
+# well-typed calls that specialize every site, then calls that fail the guards
+WARM_UP_CALLS = [("add", 1, 2), ("less", 1, 2), ("both", True, False), ("bump", 1)]
+GUARD_FAILURES = [
+    ("add", "a", "b"),
+    ("add", True, False),
+    ("add", 1, "b"),
+    ("add", 3, 4),
+    ("less", "a", "b"),
+    ("less", True, False),
+    ("less", 5, 2),
+    ("both", 1, 2),
+    ("both", True, True),
+    ("bump", "x"),
+    ("bump", True),
+    ("bump", 2),
+]
+
+
+class QuickeningTest(unittest.TestCase):
+    """Sites that see new operand types deoptimize without changing results."""
+
+    def run_calls(self, quicken, calls):
+        interpreter = interpreterv1.Interpreter(False, quicken=quicken)
+        interpreter.load(OPERATOR_SITES)
+        obj = interpreter.new_object("ops")
+        results = []
+        for method, *args in calls:
+            try:
+                results.append(interpreter.call(obj, method, *args))
+            except RuntimeError:
+                results.append(interpreter.get_error_type_and_line()[0])
+        return interpreter, results
+
+    def test_deoptimized_sites_match_generic_evaluation(self):
+        calls = WARM_UP_CALLS * WARMUP + GUARD_FAILURES
+        quickened, results = self.run_calls(True, calls)
+        _, expected = self.run_calls(False, calls)
+        self.assertEqual(results, expected)
+        self.assertIn(ErrorType.TYPE_ERROR, expected)
+        sites = quickened.quickener.sites.values()
+        self.assertEqual(len(sites), 4)
+        self.assertTrue(all(site.deopts >= 1 for site in sites))
+
+    def test_sites_specialize_on_warm_up(self):
+        quickened, _ = self.run_calls(True, WARM_UP_CALLS * WARMUP)
+        sites = quickened.quickener.sites.values()
+        self.assertTrue(all(site.specialization is not None for site in sites))
+
+
+class HeapProfilerTest(unittest.TestCase):
+    """get_heap_stats' counts agree with each other, with or without collecting."""
+
+    def setUp(self):
+        gc.disable()  # keep the cycles around until get_heap_stats collects
+        self.addCleanup(gc.enable)
+        self.interpreter = interpreterv1.Interpreter(False, profile_heap=True)
+        self.interpreter.run(SELF_REFERENCING_NODES)
+
+    def test_uncollected_cycles_are_live(self):
+        stats = self.interpreter.get_heap_stats()
+        self.assertEqual(stats["allocations"], {"main": 1, "node": 50})
+        self.assertEqual(stats["live_objects"], 50)
+        self.assertEqual(stats["heap"]["node"]["count"], 50)
+
+    def test_collect_counts_only_reachable_objects(self):
+        stats = self.interpreter.get_heap_stats(collect=True)
+        self.assertEqual(stats["live_objects"], 0)
+        self.assertEqual(stats["heap"], {})
+        self.assertEqual(stats["total_allocations"], 51)
+        self.assertGreaterEqual(stats["peak_live_objects"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Checks that FormCache's incremental re-parse matches a full BParser.parse.
+Run with python3 -m unittest.
+"""
+
+import unittest
+
+from bparser import BParser
+from lazyloader import FormCache
+from test_compactast import _assert_same
+
+PROGRAM = [
+    "(class counter",
+    "  (field count 0)",
+    "  (method bump (n) (begin (set count (+ count n)) (return count))))",
+    "",
+    "(class greeter",
+    '  (method greet (name) (print "hello " name)))',
+    "",
+    "(class main",
+    "  (field c null)",
+    "  (method main ()",
+    "    (begin (set c (new counter)) (print (call c bump 2)))))",
+]
+
+
+def _lines(program):
+    return [line + "\n" for line in program]
+
+
+class FormCacheTest(unittest.TestCase):
+    """Re-parsing after an edit gives what parsing from scratch gives."""
+
+    def reparse(self, edited):
+        cache = FormCache()
+        _, first = cache.parse(_lines(PROGRAM))
+        status, parsed = cache.parse(_lines(edited))
+        expected_status, expected = BParser.parse(_lines(edited))
+        self.assertEqual(status, expected_status)
+        if not status:
+            self.assertEqual(parsed, expected)  # error message
+        else:
+            _assert_same(self, expected, parsed)
+        return first, parsed
+
+    def test_edit_one_form(self):
+        edited = list(PROGRAM)
+        edited[5] = '  (method greet (name) (print "hi " name)))'
+        first, parsed = self.reparse(edited)
+        self.assertIs(parsed[0], first[0])
+        self.assertIsNot(parsed[1], first[1])
+        self.assertIs(parsed[2], first[2])
+
+    def test_edit_that_moves_later_forms(self):
+        edited = PROGRAM[:5] + ["  # greets", "  # twice"] + PROGRAM[5:]
+        edited[7] = "  (method greet (name) (begin (print name) (print name))))"
+        first, parsed = self.reparse(edited)
+        self.assertIs(parsed[0], first[0])
+        self.assertIs(parsed[2], first[2])  # reused, line numbers shifted
+
+    def test_edit_that_breaks_the_program(self):
+        edited = list(PROGRAM)
+        edited[5] = '  (method greet (name) (print "hello " name))))'
+        self.reparse(edited)
+
+
+if __name__ == "__main__":
+    unittest.main()
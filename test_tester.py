@@ -0,0 +1,61 @@
+"""
+Checks for tester.py's streaming output comparison. Run with python3 -m unittest.
+"""
+
+import unittest
+
+import interpreterv1
+from tester import OutputMismatch, StreamingComparator
+
+# prints 1 through 5
+COUNT_TO_FIVE = [
+    "(class main",
+    "  (field i 0)",
+    "  (method main ()",
+    "    (while (< i 5) (begin (set i (+ i 1)) (print i)))))",
+]
+
+
+class StreamingComparatorTest(unittest.TestCase):
+    """OutputMismatch reports the first wrong line and what was on it."""
+
+    def run_against(self, expected):
+        interpreter = interpreterv1.Interpreter(False)
+        comparator = StreamingComparator(expected)
+        comparator.attach(interpreter)
+        with self.assertRaises(OutputMismatch) as raised:
+            interpreter.run(COUNT_TO_FIVE)
+            comparator.finish()
+        return interpreter, raised.exception
+
+    def test_first_differing_line(self):
+        interpreter, mismatch = self.run_against(["1", "2", "4", "5", "6"])
+        self.assertEqual(
+            (mismatch.line, mismatch.expected, mismatch.received), (2, "4", "3")
+        )
+        self.assertEqual(interpreter.get_output(), ["1", "2", "3"])  # stopped early
+
+    def test_output_past_the_expected_lines(self):
+        interpreter, mismatch = self.run_against(["1", "2", "3"])
+        self.assertEqual(
+            (mismatch.line, mismatch.expected, mismatch.received), (3, None, "4")
+        )
+        self.assertEqual(interpreter.get_output(), ["1", "2", "3", "4"])
+
+    def test_output_that_ends_early(self):
+        _, mismatch = self.run_against(["1", "2", "3", "4", "5", "6", "7"])
+        self.assertEqual(
+            (mismatch.line, mismatch.expected, mismatch.received), (5, "6", None)
+        )
+
+    def test_matching_output(self):
+        interpreter = interpreterv1.Interpreter(False)
+        comparator = StreamingComparator(["1", "2", "3", "4", "5"])
+        comparator.attach(interpreter)
+        interpreter.run(COUNT_TO_FIVE)
+        comparator.finish()
+        self.assertEqual(comparator.line, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,59 +2,250 @@
 Implements all CS 131-related test logic; is entry-point for testing framework.
 """
 
+import argparse
 import asyncio
 import importlib
-from os import environ
+from os import environ, scandir, stat
+from os.path import abspath, dirname, normpath
 import sys
 import traceback
 from operator import itemgetter
+from types import ModuleType
 
+# used as modules, so watch mode's reloads reach the corpus
+import compactast
+import lazyloader
 from harness import (
     AbstractTestScaffold,
     run_all_tests,
     get_score,
     write_gradescope_output,
+    load_timing_baselines,
+    write_timing_baselines,
+    compare_timings,
+    print_timing_report,
+    print_slowest_tests,
+    NOISE_FLOOR,
 )
 
 
-class TestScaffold(AbstractTestScaffold):
-    """Implement scaffold for Brewin' interpreter; load file, validate syntax, run testcase."""
+class TestCorpus:
+    """
+    In-memory cache of test files: reads whole test directories in one pass and
+    parses each program once. Entries are keyed by mtime, so reloading a
+    directory only re-reads (and re-parses) files that changed. Programs are
+    kept as CompactPrograms (see compactast.py), which interpreters with
+    run_parsed rebuild in nested form only as far as a run needs. With
+    incremental, a changed program is instead parsed into nested lists one
+    class at a time, reusing the parse of unchanged classes (for watch mode).
+    """
+
+    def __init__(self, incremental=False):
+        self.files = {}  # path -> (mtime, lines)
+        self.parsed = {}  # path -> (mtime, parsed program or None)
+        self.directories = set()
+        self.form_caches = {} if incremental else None  # path -> FormCache
+
+    def load_directory(self, directory):
+        """
+        Read (or refresh) every file in directory; drops deleted files.
+        Returns the paths that were added, changed or deleted.
+        """
+        directory = normpath(directory)
+        seen = set()
+        changed = set()
+        try:
+            with scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        seen.add(entry.path)
+                        mtime = entry.stat().st_mtime_ns
+                        cached = self.files.get(entry.path)
+                        if cached is None or cached[0] != mtime:
+                            changed.add(entry.path)
+                        self.__read(entry.path, mtime)
+        except FileNotFoundError:
+            pass
+        for path in [p for p in self.files if dirname(p) == directory]:
+            if path not in seen:
+                del self.files[path]
+                self.parsed.pop(path, None)
+                if self.form_caches is not None:
+                    self.form_caches.pop(path, None)
+                changed.add(path)
+        self.directories.add(directory)
+        return changed
+
+    def get_lines(self, path):
+        """Lines of path (with newlines), or None if it does not exist."""
+        path = normpath(path)
+        if path in self.files:
+            return self.files[path][1]
+        if dirname(path) in self.directories:
+            return None
+        try:
+            return self.__read(path, stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def get_parsed(self, path):
+        """Parsed program for path, or None if it does not exist or fails to parse."""
+        path = normpath(path)
+        lines = self.get_lines(path)
+        if lines is None:
+            return None
+        mtime = self.files[path][0]
+        cached = self.parsed.get(path)
+        if cached is None or cached[0] != mtime:
+            if self.form_caches is not None:
+                form_cache = self.form_caches.setdefault(path, lazyloader.FormCache())
+                status, parsed_program = form_cache.parse(lines)
+            else:
+                status, parsed_program = compactast.CompactParser.parse(lines)
+            cached = (mtime, parsed_program if status else None)
+            self.parsed[path] = cached
+        return cached[1]
+
+    def clear_parses(self):
+        """Drop every parsed program (e.g. after the parser modules reloaded)."""
+        self.parsed.clear()
+        if self.form_caches is not None:
+            self.form_caches.clear()
+
+    def __read(self, path, mtime):
+        cached = self.files.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, encoding="utf-8") as handle:
+            lines = handle.readlines()
+        self.files[path] = (mtime, lines)
+        return lines
+
+
+class OutputMismatch(Exception):
+    """Raised from an interpreter's output to stop a run at its first wrong line."""
+
+    def __init__(self, line, expected, received):
+        super().__init__(line, expected, received)
+        self.line = line  # 0-based
+        self.expected = expected  # None if the output ran past the expected length
+        self.received = received  # None if the output ended early
+
+
+class StreamingComparator:
+    """
+    Checks an interpreter's output against the expected lines as it is
+    produced, raising OutputMismatch at the first line that differs or
+    that goes past the expected output (or, from finish, at the first
+    expected line the program never printed).
+    """
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.line = 0
+
+    def attach(self, interpreter):
+        """Route interpreter.output through this comparator."""
+        produce = interpreter.output
+
+        def output(val):
+            produce(val)
+            self.check(val)
+
+        interpreter.output = output
+
+    def check(self, val):
+        """Compare the next output line; raises OutputMismatch if it is wrong."""
+        if self.line >= len(self.expected):
+            raise OutputMismatch(self.line, None, val)
+        if val != self.expected[self.line]:
+            raise OutputMismatch(self.line, self.expected[self.line], val)
+        self.line += 1
+
+    def finish(self):
+        """Call once the program ends; raises OutputMismatch if output is missing."""
+        if self.line < len(self.expected):
+            raise OutputMismatch(self.line, self.expected[self.line], None)
 
-    def __init__(self, interpreter_lib):
+
+class TestScaffold(AbstractTestScaffold):
+    """
+    Implement scaffold for Brewin' interpreter; load file, validate syntax, run testcase.
+    With stream_output, output is compared while the program runs, and a test
+    stops at its first wrong line instead of running to completion. loader
+    picks how programs are loaded: "parsed" reuses the corpus' parse (if the
+    interpreter has run_parsed), while "lazy" and "eager" hand the source to
+    run with the interpreter's lazy loading switched on or off.
+    """
+
+    def __init__(
+        self, interpreter_lib, corpus=None, stream_output=False, loader="parsed"
+    ):
         self.interpreter_lib = interpreter_lib
+        self.corpus = corpus if corpus is not None else TestCorpus()
+        self.stream_output = stream_output
+        self.loader = loader
 
     def setup(self, test_case):
         inputfile, expfile, srcfile = itemgetter(
             "inputfile", "expfile", "srcfile"
         )(test_case)
 
-        with open(expfile, encoding="utf-8") as handle:
-            expected = list(map(lambda x: x.rstrip("\n"), handle.readlines()))
+        expected = self.corpus.get_lines(expfile)
+        if expected is None:
+            raise FileNotFoundError(expfile)
+        expected = list(map(lambda x: x.rstrip("\n"), expected))
 
-        try:
-            with open(inputfile, encoding="utf-8") as handle:
-                stdin = list(map(lambda x: x.rstrip("\n"), handle.readlines()))
-        except FileNotFoundError:
-            stdin = None
+        stdin = self.corpus.get_lines(inputfile)
+        if stdin is not None:
+            stdin = list(map(lambda x: x.rstrip("\n"), stdin))
 
-        with open(srcfile, encoding="utf-8") as handle:
-            program = handle.readlines()
+        program = self.corpus.get_lines(srcfile)
+        if program is None:
+            raise FileNotFoundError(srcfile)
 
         return {
             "expected": expected,
             "stdin": stdin,
             "program": program,
+            "parsed": self.corpus.get_parsed(srcfile),
         }
 
     def run_test_case(self, test_case, environment):
         expect_failure = itemgetter("expect_failure")(test_case)
-        stdin, expected, program = itemgetter("stdin", "expected", "program")(
-            environment
-        )
+        stdin, expected, program, parsed = itemgetter(
+            "stdin", "expected", "program", "parsed"
+        )(environment)
         interpreter = self.interpreter_lib.Interpreter(False, stdin, False)
+        comparator = None
+        if self.stream_output and not expect_failure:
+            comparator = StreamingComparator(expected)
+            comparator.attach(interpreter)
         try:
-            interpreter.validate_program(program)
-            interpreter.run(program)
+            # reuse the corpus' parse when the interpreter can run it directly
+            if (
+                self.loader == "parsed"
+                and parsed is not None
+                and hasattr(interpreter, "run_parsed")
+            ):
+                interpreter.run_parsed(parsed)
+            else:
+                if self.loader != "parsed" and hasattr(interpreter, "lazy_load"):
+                    interpreter.lazy_load = self.loader == "lazy"
+                interpreter.validate_program(program)
+                interpreter.run(program)
+            if comparator is not None:
+                comparator.finish()
+        except OutputMismatch as mismatch:
+            print(f"\nOutput diverged at line {mismatch.line + 1}:")
+            if mismatch.expected is None:
+                print(f"Expected no more output, received: {mismatch.received!r}")
+            elif mismatch.received is None:
+                print(f"Expected: {mismatch.expected!r}, but the output ended")
+            else:
+                print(f"Expected: {mismatch.expected!r}")
+                print(f"Received: {mismatch.received!r}")
+            return 0
         except Exception as exception:  # pylint: disable=broad-except
             if expect_failure:
                 error_type, _ = interpreter.get_error_type_and_line()
@@ -70,6 +261,10 @@ class TestScaffold(AbstractTestScaffold):
             print(exception)
             traceback.print_exc()
             return 0
+        finally:
+            # statement count, for interpreters that keep one
+            if hasattr(interpreter, "steps"):
+                environment["metrics"] = {"steps": interpreter.steps}
 
         if expect_failure:
             print("\nExpected error:")
@@ -134,6 +329,8 @@ def generate_test_suite_v1():
             "test_if",
             "test_inputi",
             "test_knock_knock",
+            "test_lazy_string_parens",
+            "test_lazy_top_level_token",
             "test_new1",
             "test_new2",
             "test_null_equality",
@@ -151,12 +348,14 @@ def generate_test_suite_v1():
             "test_set",
             "test_shadow",
             "test_while",
+            "test_while_sum",
         ],
         [
             "test_if",
             "test_incompat_operands1",
             "test_dup_field",
             "test_dup_method",
+            "test_lazy_empty_member",
         ],
     )
 
@@ -171,16 +370,218 @@ def generate_test_suite_v3():
     return __generate_test_suite(3, [], [])
 
 
+def parse_args(argv):
+    """Parse tester CLI arguments (version number plus optional timing flags)."""
+    parser = argparse.ArgumentParser(description="Run the Brewin test suite.")
+    parser.add_argument("version", help="interpreter version to test (1, 2 or 3)")
+    parser.add_argument(
+        "--backend",
+        default="interpreter",
+        choices=["interpreter", "compiled"],
+        help="run tests with interpreterv<version> (default) or, for version 1,"
+        " the ahead-of-time transpiler in transpiler.py",
+    )
+    parser.add_argument(
+        "--loader",
+        default="parsed",
+        choices=["parsed", "lazy", "eager"],
+        help="reuse the tester's parse of each program (default), or run the"
+        " source through the interpreter's lazy or eager loader",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="run each test this many times and record the median timing",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="timing baseline file; compare against it (or create it if missing)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="overwrite the baseline file with this run's timings",
+    )
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=1.5,
+        help="fail if CPU time exceeds the baseline by this factor (default 1.5)",
+    )
+    parser.add_argument(
+        "--noise-floor",
+        type=float,
+        default=NOISE_FLOOR * 1000,
+        help="ignore CPU time increases below this many ms per test, divided by"
+        f" the square root of --repeat (default {NOISE_FLOOR * 1000:g})",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=5,
+        help="print the N most expensive tests after the run (default 5, 0 for none)",
+    )
+    parser.add_argument(
+        "--sort-by",
+        default="wall_time",
+        choices=[
+            "wall_time",
+            "cpu_time",
+            "user_time",
+            "system_time",
+            "steps",
+            "peak_memory",
+        ],
+        help="resource to rank the slowest tests by (default wall_time)",
+    )
+    parser.add_argument(
+        "--track-memory",
+        action="store_true",
+        help="run each test once more under tracemalloc to record peak heap usage",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="compare output while tests run and stop each at its first wrong line",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running; re-run tests whose files (or the interpreter) change",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="seconds between checks for changes in watch mode (default 0.5)",
+    )
+    return parser.parse_args(argv)
+
+
+def _test_paths(test):
+    return {normpath(test[key]) for key in ("srcfile", "inputfile", "expfile")}
+
+
+def _mtime(path):
+    try:
+        return stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _local_imports(*roots):
+    """
+    Map the roots and every module from their directory that they import
+    (directly or through each other) to the names of the modules from that
+    directory it imports. Modules come after the ones they import.
+    """
+    directory = dirname(abspath(roots[0].__file__))
+    imports = {}
+
+    def visit(module):
+        if module.__name__ in imports:
+            return
+        imports[module.__name__] = None  # in progress; guards against cycles
+        dependencies = set()
+        for value in list(vars(module).values()):
+            if not isinstance(value, ModuleType):
+                value = sys.modules.get(getattr(value, "__module__", None))
+            path = getattr(value, "__file__", None)
+            if (
+                value is not None
+                and value is not module
+                and value.__name__ != "__main__"
+                and path is not None
+                and dirname(abspath(path)) == directory
+            ):
+                dependencies.add(value.__name__)
+                visit(value)
+        del imports[module.__name__]  # re-insert after its dependencies
+        imports[module.__name__] = dependencies
+
+    for root in roots:
+        visit(root)
+    return imports
+
+
+def _reload_modules(imports, changed):
+    """
+    Reload the changed modules and every module importing them, in dependency
+    order; returns the names of the modules that were reloaded.
+    """
+    reloaded = set()
+    for name, dependencies in imports.items():
+        if name in changed or dependencies & reloaded:
+            importlib.reload(sys.modules[name])
+            reloaded.add(name)
+    return reloaded
+
+
+async def watch_tests(scaffold, tests, results, interval=0.5, **run_options):
+    """
+    Watch mode: poll the test directories and the source of the interpreter
+    and of every module it or the corpus' parsers import from this directory
+    every interval seconds. Re-runs only the tests whose program, input or
+    expected output changed; after a module changes, it and the modules that
+    import it are reloaded (re-parsing the tests if a parser module reloaded)
+    and every test re-runs. Runs until interrupted.
+    """
+    corpus = scaffold.corpus
+    parser_roots = (compactast, lazyloader)
+
+    def module_mtimes():
+        imports = _local_imports(scaffold.interpreter_lib, *parser_roots)
+        files = {name: sys.modules[name].__file__ for name in imports}
+        return imports, {name: _mtime(path) for name, path in files.items()}
+
+    imports, mtimes = module_mtimes()
+    latest = {result["name"]: result for result in results}
+    print(f"Watching for changes every {interval}s (Ctrl-C to stop)...")
+    while True:
+        await asyncio.sleep(interval)
+        changed = set()
+        for directory in sorted(corpus.directories):
+            changed |= corpus.load_directory(directory)
+        affected = [test for test in tests if changed & _test_paths(test)]
+        changed_modules = {
+            name
+            for name, mtime in mtimes.items()
+            if _mtime(sys.modules[name].__file__) != mtime
+        }
+        if changed_modules:
+            try:
+                reloaded = _reload_modules(imports, changed_modules)
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                reloaded = None
+            # a failed reload waits for the next edit instead of retrying
+            imports, mtimes = module_mtimes()
+            if reloaded is None:
+                continue
+            if reloaded & set(_local_imports(*parser_roots)):
+                corpus.clear_parses()
+            affected = tests
+        if not affected:
+            continue
+        for result in await run_all_tests(scaffold, affected, **run_options):
+            latest[result["name"]] = result
+        results = [latest[test["name"]] for test in tests]
+        print(f"Total Score: {get_score(results) / len(results) * 100.0:9.2f}%")
+        write_gradescope_output(results, environ.get("PROD", False))
+
+
 async def main():
     """main entrypoint: argparses, delegates to test scaffold, suite generator, gradescope output"""
-    if not sys.argv:
-        raise ValueError("Error: Missing version number argument")
-    version = sys.argv[1]
+    args = parse_args(sys.argv[1:])
+    version = args.version
     module_name = f"interpreterv{version}"
+    if args.backend == "compiled":
+        if version != "1":
+            raise ValueError("The compiled backend only supports version 1")
+        module_name = "transpiler"
     interpreter = importlib.import_module(module_name)
 
-    scaffold = TestScaffold(interpreter)
-
     match version:
         case "1":
             tests = generate_test_suite_v1()
@@ -191,13 +592,49 @@ async def main():
         case _:
             raise ValueError("Unsupported version; expect one of 1,2,3")
 
-    results = await run_all_tests(scaffold, tests)
+    corpus = TestCorpus(incremental=args.watch)
+    for directory in {dirname(test["srcfile"]) for test in tests}:
+        corpus.load_directory(directory)
+    scaffold = TestScaffold(
+        interpreter, corpus, stream_output=args.stream, loader=args.loader
+    )
+
+    results = await run_all_tests(
+        scaffold, tests, repeat=args.repeat, track_memory=args.track_memory
+    )
     total_score = get_score(results) / len(results) * 100.0
     print(f"Total Score: {total_score:9.2f}%")
+    print_slowest_tests(results, args.slowest, args.sort_by)
 
     # flag that toggles write path for results.json
     write_gradescope_output(results, environ.get("PROD", False))
 
+    if args.watch:
+        await watch_tests(
+            scaffold,
+            tests,
+            results,
+            args.interval,
+            repeat=args.repeat,
+            track_memory=args.track_memory,
+        )
+
+    if not args.baseline:
+        return 0
+    baselines = load_timing_baselines(args.baseline)
+    if args.update_baseline or not baselines:
+        write_timing_baselines(results, args.baseline)
+        print(f"Wrote timing baselines to {args.baseline}")
+        return 0
+    report = compare_timings(
+        results, baselines, args.max_slowdown, args.noise_floor / 1000
+    )
+    print_timing_report(report)
+    return 0 if report["passed"] else 1
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:  # leaving watch mode
+        sys.exit(0)
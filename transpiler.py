@@ -0,0 +1,585 @@
+"""
+Ahead-of-time backend: translates a parsed Brewin program into Python source,
+with one Python class per Brewin class (fields in __slots__) and one Python
+function per method (parameters as locals), and runs the compiled code object.
+
+Behavior matches interpreterv1: every runtime check raises the same ErrorType
+through InterpreterBase.error, and class/field/method discovery errors are
+reported before the program starts. Code objects are cached per program text
+(and version of this module), in memory and optionally on disk.
+
+The module doubles as an interpreter module for the tester:
+python3 tester.py 1 --backend compiled runs the suite through it.
+"""
+
+import hashlib
+import marshal
+import sys
+from os import makedirs
+from os.path import exists, join
+from types import CodeType
+
+from bparser import BParser
+from intbase import InterpreterBase, ErrorType
+from interpreterv1 import Nothing
+
+
+class BrewinError(Exception):
+    """Raised by compiled code; CompiledInterpreter reports it through error()."""
+
+    def __init__(self, error_type):
+        super().__init__(error_type)
+        self.error_type = error_type
+
+
+class BrewinObject:
+    """Base class of every compiled Brewin class."""
+
+    __slots__ = ()
+    _methods = {}  # Brewin method name -> (function, parameter count)
+
+
+NOTHING = Nothing()
+UNKNOWN_NAME = object()
+
+
+def _error(error_type):
+    raise BrewinError(ErrorType(error_type))
+
+
+def _malformed():
+    raise IndexError("malformed statement or expression")
+
+
+def _type(val):
+    # every Brewin object has the same type as far as the operators care
+    return BrewinObject if isinstance(val, BrewinObject) else type(val)
+
+
+def _fmt(txt):
+    if isinstance(txt, str) and txt.startswith('"') and txt.endswith('"'):
+        return txt[1:-1]
+    if isinstance(txt, bool):
+        return InterpreterBase.TRUE_DEF if txt else InterpreterBase.FALSE_DEF
+    return str(txt)
+
+
+def _cond(condition):
+    if type(condition) is not bool:
+        _error(1)
+    return condition
+
+
+def _call(args, obj, name):
+    if type(obj) is Nothing:
+        _error(4)
+    method = obj._methods.get(name)
+    if method is None:
+        _error(2)
+    if method[1] != len(args):
+        _error(1)
+    return method[0](obj, *args)
+
+
+def _read_int(interpreter):
+    return int(interpreter.get_input())
+
+
+def _read_str(interpreter):
+    return str(interpreter.get_input())
+
+
+def _add(op1, op2):
+    if type(op1) is int and type(op2) is int:
+        return op1 + op2
+    t1, t2 = _type(op1), _type(op2)
+    if t1 is not t2 or not isinstance(op1, int) and not isinstance(op1, str):
+        _error(1)
+    if isinstance(op1, int):
+        return op1 + op2
+    if op1.endswith('"'):
+        op1 = op1[:-1]
+    if op2.startswith('"'):
+        op2 = op2[1:]
+    return op1 + op2
+
+
+def _check_ints(op1, op2):
+    if not isinstance(op1, int) or not isinstance(op2, int):
+        _error(1)
+
+
+def _sub(op1, op2):
+    _check_ints(op1, op2)
+    return op1 - op2
+
+
+def _mod(op1, op2):
+    _check_ints(op1, op2)
+    return op1 % op2
+
+
+def _mul(op1, op2):
+    _check_ints(op1, op2)
+    return op1 * op2
+
+
+def _div(op1, op2):
+    _check_ints(op1, op2)
+    return op1 // op2
+
+
+def _check_equality(t1, t2):
+    if (
+        t1 is not t2
+        and (t1 is not Nothing or t2 is not BrewinObject)
+        and (t1 is not BrewinObject or t2 is not Nothing)
+    ):
+        _error(1)
+
+
+def _eq(op1, op2):
+    t1, t2 = _type(op1), _type(op2)
+    _check_equality(t1, t2)
+    if t1 is Nothing or t2 is Nothing:
+        return t1 == t2
+    return op1 == op2
+
+
+def _ne(op1, op2):
+    t1, t2 = _type(op1), _type(op2)
+    _check_equality(t1, t2)
+    if t1 is Nothing or t2 is Nothing:
+        return t1 != t2
+    return op1 != op2
+
+
+def _check_ordered(op1, op2):
+    if type(op1) is type(op2) and (type(op1) is int or type(op1) is str):
+        return
+    if (
+        _type(op1) is not _type(op2)
+        or not isinstance(op1, int)
+        and not isinstance(op1, str)
+    ):
+        _error(1)
+
+
+def _ge(op1, op2):
+    _check_ordered(op1, op2)
+    return op1 >= op2
+
+
+def _le(op1, op2):
+    _check_ordered(op1, op2)
+    return op1 <= op2
+
+
+def _gt(op1, op2):
+    _check_ordered(op1, op2)
+    return op1 > op2
+
+
+def _lt(op1, op2):
+    _check_ordered(op1, op2)
+    return op1 < op2
+
+
+def _and(op1, op2):
+    if type(op1) is not bool or type(op2) is not bool:
+        _error(1)
+    return op1 and op2
+
+
+def _or(op1, op2):
+    if type(op1) is not bool or type(op2) is not bool:
+        _error(1)
+    return op1 or op2
+
+
+def _not(op1):
+    # mirrors ObjectDefinition's '!' exactly
+    t1 = type(op1)
+    if t1 is not bool:
+        _error(1)
+    return not t1
+
+
+def _unknown_operator(_op1, _op2):
+    return None
+
+
+BINARY_OPERATORS = {
+    "+": "_add",
+    "-": "_sub",
+    "%": "_mod",
+    "*": "_mul",
+    "/": "_div",
+    "==": "_eq",
+    "!=": "_ne",
+    ">=": "_ge",
+    "<=": "_le",
+    ">": "_gt",
+    "<": "_lt",
+    "&": "_and",
+    "|": "_or",
+}
+
+RUNTIME = {
+    "BrewinObject": BrewinObject,
+    "_NOTHING": NOTHING,
+    "_error": _error,
+    "_malformed": _malformed,
+    "_fmt": _fmt,
+    "_cond": _cond,
+    "_call": _call,
+    "_read_int": _read_int,
+    "_read_str": _read_str,
+    "_not": _not,
+    "_unknown_operator": _unknown_operator,
+}
+RUNTIME.update({name: globals()[name] for name in BINARY_OPERATORS.values()})
+
+
+class ClassInfo:
+    """Python-side names for one Brewin class."""
+
+    def __init__(self, index, name):
+        self.name = name
+        self.py_name = f"C{index}"
+        self.fields = {}  # Brewin field name -> (slot name, initializer token)
+        self.methods = {}  # Brewin method name -> (function name, params, body)
+
+
+class Transpiler:
+    """Translates a parsed program (BParser.parse output) into Python source."""
+
+    def __init__(self, parsed_program):
+        self.parsed_program = parsed_program
+        self.classes = {}
+
+    def transpile(self):
+        """Return Python source defining every class plus a CLASSES table."""
+        self.__discover_classes()
+        lines = []
+        for info in self.classes.values():
+            lines += self.__class_source(info)
+        lines.append("CLASSES = {")
+        for name, info in self.classes.items():
+            lines.append(f"    {name!r}: {info.py_name},")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    # same checks, in the same order, as Interpreter's class discovery
+    def __discover_classes(self):
+        for class_def in self.parsed_program:
+            if class_def[1] in self.classes:
+                _error(1)
+            info = ClassInfo(len(self.classes), str(class_def[1]))
+            for item in class_def:
+                if item[0] == InterpreterBase.FIELD_DEF:
+                    if item[1] in info.fields:
+                        _error(2)
+                    info.fields[str(item[1])] = (f"f{len(info.fields)}", item[2])
+                elif item[0] == InterpreterBase.METHOD_DEF:
+                    if item[1] in info.methods:
+                        _error(2)
+                    info.methods[str(item[1])] = (
+                        f"m{len(info.methods)}",
+                        item[2],
+                        item[3],
+                    )
+            self.classes[info.name] = info
+
+    def __class_source(self, info):
+        slots = "".join(f"{slot!r}, " for slot, _ in info.fields.values())
+        lines = [
+            f"class {info.py_name}(BrewinObject):",
+            f"    __slots__ = ({slots})",
+            f"    _brewin_name = {info.name!r}",
+            "",
+            "    def __init__(self):",
+        ]
+        for slot, init in info.fields.values():
+            lines.append(f"        self.{slot} = {self.__field_initializer(init)}")
+        if not info.fields:
+            lines.append("        pass")
+        for function, params, body in info.methods.values():
+            lines.append("")
+            lines += self.__method_source(info, function, params, body)
+        lines.append("")
+        lines.append(f"{info.py_name}._methods = {{")
+        for name, (function, params, _) in info.methods.items():
+            lines.append(f"    {name!r}: ({info.py_name}.{function}, {len(params)}),")
+        lines += ["}", "", ""]
+        return lines
+
+    def __field_initializer(self, token):
+        if isinstance(token, list):
+            return "_malformed()"
+        return self.__constant(token)
+
+    def __method_source(self, info, function, params, body):
+        # repeated parameter names bind the last argument, like the interpreter
+        local_names = {str(name): f"p{i}" for i, name in enumerate(params)}
+        args = "".join(f", p{i}" for i in range(len(params)))
+        scope = MethodScope(info, local_names, self.classes)
+        lines = [f"    def {function}(self{args}):"]
+        lines += scope.statement(body, 2) or ["        pass"]
+        return lines
+
+    def __constant(self, token):
+        return MethodScope(None, {}, self.classes).constant(token)
+
+
+class MethodScope:
+    """Generates the body of one method; knows its locals, fields and classes."""
+
+    def __init__(self, info, local_names, classes):
+        self.info = info
+        self.local_names = local_names
+        self.classes = classes
+
+    def statement(self, statement, depth):
+        """Python lines (indented depth levels) for one Brewin statement."""
+        pad = "    " * depth
+        if not isinstance(statement, list) or not statement:
+            return [f"{pad}pass"]
+        keyword = statement[0]
+        if keyword == InterpreterBase.PRINT_DEF:
+            terms = [self.__print_term(term) for term in statement[1:]]
+            return [f"{pad}_interpreter.output({' + '.join(terms) or repr('')})"]
+        if keyword in (InterpreterBase.INPUT_STRING_DEF, InterpreterBase.INPUT_INT_DEF):
+            if len(statement) < 2:
+                return [f"{pad}_malformed()"]
+            reader = (
+                "_read_int" if keyword == InterpreterBase.INPUT_INT_DEF else "_read_str"
+            )
+            target = self.__target(statement[1])
+            if target is None:
+                return [f"{pad}_interpreter.get_input()", f"{pad}_error(2)"]
+            return [f"{pad}{target} = {reader}(_interpreter)"]
+        if keyword == InterpreterBase.SET_DEF:
+            if len(statement) < 3:
+                return [f"{pad}_malformed()"]
+            value = self.expression(statement[2])
+            target = self.__target(statement[1])
+            if target is None:
+                return [f"{pad}{value}", f"{pad}_error(2)"]
+            return [f"{pad}{target} = {value}"]
+        if keyword == InterpreterBase.CALL_DEF:
+            return [f"{pad}{self.expression(statement)}"]
+        if keyword == InterpreterBase.WHILE_DEF:
+            if len(statement) < 3:
+                return [f"{pad}_malformed()"]
+            lines = [f"{pad}while _cond({self.expression(statement[1])}):"]
+            return lines + self.statement(statement[2], depth + 1)
+        if keyword == InterpreterBase.IF_DEF:
+            if len(statement) < 3:
+                return [f"{pad}_malformed()"]
+            lines = [f"{pad}if _cond({self.expression(statement[1])}):"]
+            lines += self.statement(statement[2], depth + 1)
+            if len(statement) == 4:
+                lines.append(f"{pad}else:")
+                lines += self.statement(statement[3], depth + 1)
+            return lines
+        if keyword == InterpreterBase.RETURN_DEF:
+            if len(statement) == 2:
+                return [f"{pad}return {self.expression(statement[1])}"]
+            return [f"{pad}return None"]
+        if keyword == InterpreterBase.BEGIN_DEF:
+            lines = []
+            for sub_statement in statement[1:]:
+                if sub_statement == InterpreterBase.BEGIN_DEF:
+                    continue
+                lines += self.statement(sub_statement, depth)
+            return lines or [f"{pad}pass"]
+        return [f"{pad}pass"]
+
+    def expression(self, expression):
+        """A Python expression evaluating expression in this method."""
+        if not isinstance(expression, list):
+            return self.__variable_or_constant(expression)
+        if not expression:
+            return "_malformed()"
+        operator = expression[0]
+        if operator == InterpreterBase.CALL_DEF:
+            return self.__call(expression)
+        if operator == InterpreterBase.NEW_DEF:
+            if len(expression) < 2:
+                return "_malformed()"
+            if expression[1] not in self.classes:
+                return "_error(1)"
+            return f"{self.classes[str(expression[1])].py_name}()"
+        if len(expression) < 2:
+            return "_malformed()"
+        op1 = self.expression(expression[1])
+        if operator == "!":
+            return f"_not({op1})"
+        if len(expression) < 3:
+            return f"({op1}, _malformed())"
+        op2 = self.expression(expression[2])
+        function = BINARY_OPERATORS.get(operator, "_unknown_operator")
+        return f"{function}({op1}, {op2})"
+
+    def constant(self, token):
+        """A Python literal for a constant token (or code raising NAME_ERROR)."""
+        value = self.constant_value(token)
+        if value is UNKNOWN_NAME:
+            return "_error(2)"
+        if value is NOTHING:
+            return "_NOTHING"
+        return repr(value)
+
+    def constant_value(self, token):
+        """The value of a constant token, converted like the interpreter does."""
+        if token.startswith('"'):
+            return str(token)
+        if token == InterpreterBase.TRUE_DEF:
+            return True
+        if token == InterpreterBase.FALSE_DEF:
+            return False
+        if token == InterpreterBase.NULL_DEF:
+            return NOTHING
+        try:
+            return int(token)
+        except ValueError:
+            if str(token) in self.classes:
+                return str(token)
+            return UNKNOWN_NAME
+
+    def __variable_or_constant(self, token):
+        target = self.__target(token)
+        return target if target is not None else self.constant(token)
+
+    # parameters shadow fields; None if token is neither
+    def __target(self, token):
+        if isinstance(token, list):
+            return None
+        if str(token) in self.local_names:
+            return self.local_names[str(token)]
+        if self.info is not None and str(token) in self.info.fields:
+            return f"self.{self.info.fields[str(token)][0]}"
+        return None
+
+    # constant terms are formatted at compile time
+    def __print_term(self, term):
+        if not isinstance(term, list) and self.__target(term) is None:
+            value = self.constant_value(term)
+            if value is not UNKNOWN_NAME and value is not NOTHING:
+                return repr(_fmt(value))
+        return f"_fmt({self.expression(term)})"
+
+    def __call(self, expression):
+        if len(expression) < 3:
+            return "_malformed()"
+        args = [self.expression(arg) for arg in expression[3:]]
+        name = str(expression[2])
+        if expression[1] == InterpreterBase.ME_DEF:
+            # me always has this class' methods, so bind statically when we can
+            method = self.info.methods.get(name)
+            if method is not None and len(method[1]) == len(args):
+                return f"self.{method[0]}({', '.join(args)})"
+            target = "self"
+        else:
+            target = self.expression(expression[1])
+        packed = "".join(f"{arg}, " for arg in args)
+        return f"_call(({packed}), {target}, {name!r})"
+
+
+# digest of this file, so cached code objects from an older transpiler (or older
+# runtime helpers) are never reused
+with open(__file__, "rb") as _source:
+    TRANSPILER_VERSION = hashlib.sha256(_source.read()).hexdigest()
+
+
+class CompiledProgramCache:
+    """
+    Code objects keyed by a digest of the program text and TRANSPILER_VERSION;
+    optionally on disk.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.code_objects = {}
+
+    def get(self, program, parsed_program):
+        """Return the compiled code object for program, transpiling if needed."""
+        digest = hashlib.sha256(
+            (TRANSPILER_VERSION + "".join(program)).encode("utf-8")
+        ).hexdigest()
+        code = self.code_objects.get(digest)
+        if code is not None:
+            return code
+        path = None
+        if self.directory is not None:
+            path = join(
+                self.directory, f"{digest}.{sys.implementation.cache_tag}.brewinc"
+            )
+            if exists(path):
+                code = self.__load(path)
+        if code is None:
+            source = Transpiler(parsed_program).transpile()
+            code = compile(source, f"<brewin {digest[:12]}>", "exec")
+            if path is not None:
+                makedirs(self.directory, exist_ok=True)
+                with open(path, "wb") as handle:
+                    marshal.dump(code, handle)
+        self.code_objects[digest] = code
+        return code
+
+    # a corrupt or truncated file is a cache miss; it is overwritten
+    @staticmethod
+    def __load(path):
+        try:
+            with open(path, "rb") as handle:
+                code = marshal.load(handle)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return code if isinstance(code, CodeType) else None
+
+
+DEFAULT_CACHE = CompiledProgramCache()
+
+
+class CompiledInterpreter(InterpreterBase):
+    """Drop-in alternative to interpreterv1.Interpreter that runs compiled code."""
+
+    def __init__(self, console_output=True, inp=None, trace_output=False, cache=None):
+        super().__init__(console_output, inp)
+        self.trace_output = trace_output
+        self.cache = cache if cache is not None else DEFAULT_CACHE
+
+    def run(self, program):
+        result, parsed_program = BParser.parse(program)
+        if not result:
+            return SyntaxError
+        try:
+            code = self.cache.get(program, parsed_program)
+            namespace = dict(RUNTIME, _interpreter=self)
+            exec(code, namespace)  # pylint: disable=exec-used
+            classes = namespace["CLASSES"]
+            if InterpreterBase.MAIN_CLASS_DEF not in classes:
+                _error(1)
+            main_obj = classes[InterpreterBase.MAIN_CLASS_DEF]()
+            _call((), main_obj, InterpreterBase.MAIN_FUNC_DEF)
+        except BrewinError as exception:
+            self.error(exception.error_type)
+        return None
+
+
+# lets the tester load this module in place of interpreterv1
+Interpreter = CompiledInterpreter
+
+
+def get_source(program):
+    """Python source the transpiler generates for program (for inspection)."""
+    result, parsed_program = BParser.parse(program)
+    if not result:
+        raise SyntaxError(parsed_program)
+    return Transpiler(parsed_program).transpile()
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], encoding="utf-8") as source_file:
+        print(get_source(source_file.readlines()))